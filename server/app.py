@@ -1,63 +1,49 @@
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 import logging
 from logging.handlers import RotatingFileHandler
-from flask import Flask, jsonify, request, make_response
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, Response, current_app, request
 from flask_cors import CORS
 from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import JWTManager, create_access_token
 from flask_restful import Api, Resource
-from models import db, User, Event, UserEvent, Ticket
+from werkzeug.middleware.proxy_fix import ProxyFix
+from models import db, User, Event, UserEvent, Ticket, Order, SeatHold, TicketArchive, UserEventArchive
+from cache import init_cache, cache_stats, cached, respond, event_etag, parse_event_etag, event_key, event_list_key, event_content_generation, invalidate_event, invalidate_events
+from bulk import parse_items, clean_event, create_events, update_events, delete_events
+from database import engine_options, install_pool_metrics, pool_stats
+from metrics import init_metrics
+from compression import init_compression
+from ratelimit import init_rate_limits
+from replicas import init_replicas, primary_fallback, replica_stats
+from auth import init_auth, user_claims, login_required, admin_required, revoke_current_token
+from hashing import init_hashing, hash_password, verify_password, needs_rehash, HashingBusy
+from inventory import reserve_tickets, event_exists, has_seat_map
+from availability import init_availability, publish_availability, availability_stream
+from archive import archive_events, archive_cutoff
+from transfer import TABLES, TransferError, export_table, import_table
+from seats import SeatError, create_seat_map, seat_availability, place_hold, release_hold, purchase_hold, sweep_holds
+from search import search_events
+from stats import record_ticket_sale, record_registration, rebuild_event_stats, event_stats, dashboard
+from orders import enqueue_order, process_orders, run_order_worker, wait_for_order
+from pagination import encode_cursor, decode_cursor, parse_limit, parse_datetime
+from serializers import serializer_for, orjson, output_json, stream_format, stream_rows
+from sqlalchemy import and_, or_, select, tuple_, union_all, update
+from sqlalchemy.exc import IntegrityError
 import re
+import threading
+import time
+import click
+from flask.cli import with_appcontext
+from config import config_from_env
 
 # Load environment variables from a .env file
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY')  # Set JWT secret key
-
-# Initialize CORS
-CORS(app)
-
-# Initialize JWT Manager
-jwt = JWTManager(app)
-
-# Initialize database
-db.init_app(app)
-
-# Initialize Flask-Migrate
-migrate = Migrate(app, db)
-
-# Initialize Flask-RESTful API
-api = Api(app)
-
-# Configure logging
-if not app.debug:
-    handler = RotatingFileHandler('app.log', maxBytes=10000, backupCount=1)
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    )
-    handler.setFormatter(formatter)
-    app.logger.addHandler(handler)
-
-# Middleware to handle current user
-@app.before_request
-def get_current_user():
-    token = request.headers.get('Authorization')
-    if token:
-        token = token.replace('Bearer ', '')
-        try:
-            request.user = get_jwt_identity()  # Get current user from JWT
-        except Exception:
-            request.user = None
-    else:
-        request.user = None
+# Extensions are created once and bound to each app in create_app
+jwt = JWTManager()
+migrate = Migrate()
 
 # Helper function for database commit
 def handle_db_commit(session):
@@ -68,6 +54,39 @@ def handle_db_commit(session):
         return str(e), 500
     return None
 
+# Fetch one keyset page of events ordered by (datetime, id). One extra row is
+# read to know whether there is a next page.
+def event_page(serializer, query, limit):
+    rows = db.session.execute(query.order_by(Event.datetime, Event.id).limit(limit + 1)).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers['X-Next-Cursor'] = encode_cursor(rows[-1].datetime, rows[-1].id)
+    return serializer.all(rows), headers
+
+# The current user's hold, or None if it doesn't exist or belongs to someone else
+def own_hold(hold_id):
+    hold = db.session.get(SeatHold, hold_id)
+    if hold is None or hold.user_id != request.user['id']:
+        return None
+    return hold
+
+# Reads cover active events only unless ?include_archived=true
+def include_archived():
+    return request.args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+# Rows of model, plus those of its archive table when asked for, by id
+def with_archive(model, archive):
+    statement = serializer_for(model).select()
+    if include_archived():
+        statement = union_all(statement, serializer_for(archive).select())
+        return statement.order_by(statement.selected_columns.id)
+    return statement.order_by(model.id)
+
+# Response for when the password hashing pool is saturated
+def hashing_busy():
+    return {'error': 'Server busy, please retry shortly'}, 503, {'Retry-After': '1'}
+
 # Email validation function
 def validate_email(email):
     return re.match(r"[^@]+@[^@]+\.[^@]+", email) is not None
@@ -89,10 +108,13 @@ class Users(Resource):
         if not validate_email(email):
             return {'error': 'Invalid email format'}, 400
 
-        user = User.query.filter_by(email=email).first()
+        user = User.query.filter(db.func.lower(User.email) == email).first()
 
-        if not user or not check_password_hash(user.password_hash, password):
-            return {'error': 'Invalid email or password'}, 401
+        try:
+            if not user or not verify_password(user.password_hash, password):
+                return {'error': 'Invalid email or password'}, 401
+        except HashingBusy:
+            return hashing_busy()
 
         return user.to_dict(), 200
 
@@ -113,7 +135,10 @@ class Users(Resource):
             return {'error': 'User already exists with this email'}, 409
 
         is_admin = email.endswith('@admin.com')
-        password_hash = generate_password_hash(password)
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            return hashing_busy()
         user = User(username=username, email=email, password_hash=password_hash, is_admin=is_admin)
         
         db.session.add(user)
@@ -130,80 +155,153 @@ class Login(Resource):
         password = data.get('password')
 
         user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password_hash, password):
-            access_token = create_access_token(identity={'id': user.id, 'username': user.username})
+        try:
+            valid = user is not None and verify_password(user.password_hash, password)
+        except HashingBusy:
+            return hashing_busy()
+
+        if valid:
+            # Upgrade hashes made with old parameters while we have the plaintext
+            if needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = hash_password(password)
+                    if handle_db_commit(db.session):
+                        current_app.logger.warning('Failed to rehash password for user %s', user.id)
+                except HashingBusy:
+                    pass
+            access_token = create_access_token(identity=str(user.id), additional_claims=user_claims(user))
             return {'access_token': access_token, 'message': f'Welcome back {user.username}!'}, 200
         else:
             return {'message': 'Invalid email or password!'}, 401
 
+class Logout(Resource):
+    @login_required
+    def post(self):
+        revoke_current_token()
+        error = handle_db_commit(db.session)
+        if error:
+            return {'error': 'Failed to log out: ' + error[0]}, error[1]
+        return {'message': 'Logged out'}, 200
+
 class Events(Resource):
     def get(self):
-        events = Event.query.all()
-        return [event.to_dict() for event in events], 200
-
-    @jwt_required()
+        args = request.args
+        limit = parse_limit(args.get('limit'), current_app.config['EVENTS_PAGE_SIZE'], current_app.config['EVENTS_MAX_PAGE_SIZE'])
+        if limit is None:
+            return {'error': 'Invalid limit'}, 400
+
+        serializer = serializer_for(Event)
+        query = serializer.select()
+        if args.get('location'):
+            query = query.where(Event.location == args['location'])
+        if args.get('start'):
+            start = parse_datetime(args['start'])
+            if start is None:
+                return {'error': 'Invalid start date'}, 400
+            query = query.where(Event.datetime >= start)
+        if args.get('end'):
+            end = parse_datetime(args['end'])
+            if end is None:
+                return {'error': 'Invalid end date'}, 400
+            query = query.where(Event.datetime < end)
+        if args.get('available', '').lower() in ('1', 'true', 'yes'):
+            query = query.where(Event.number_of_tickets > 0)
+        if not include_archived():
+            query = query.where(Event.archived_at.is_(None))
+        if args.get('cursor'):
+            cursor = decode_cursor(args['cursor'])
+            if cursor is None:
+                return {'error': 'Invalid cursor'}, 400
+            query = query.where(tuple_(Event.datetime, Event.id) > cursor)
+
+        format = stream_format()
+        if format:
+            return stream_rows(serializer, query.order_by(Event.datetime, Event.id), format)
+
+        return respond(cached(event_list_key(), lambda: event_page(serializer, query, limit)))
+
+    @admin_required
     def post(self):
-        if not request.user.get('is_admin', False):
-            return {'error': 'Admin privileges required'}, 403
-
         data = request.json
         if not all([data.get('name'), data.get('image'), data.get('location'), data.get('description'), data.get('capacity'), data.get('number_of_tickets')]):
             return {'error': 'Missing required fields'}, 400
 
+        event_datetime = parse_datetime(data.get('datetime')) if data.get('datetime') else datetime.utcnow()
+        if event_datetime is None:
+            return {'error': 'Invalid datetime'}, 400
+
         event = Event(
             image=data['image'],
             name=data['name'],
-            datetime=data.get('datetime'),
+            datetime=event_datetime,
             location=data['location'],
             capacity=data['capacity'],
             description=data['description'],
-            number_of_tickets=data['number_of_tickets']
+            number_of_tickets=data['number_of_tickets'],
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude')
         )
         db.session.add(event)
         error = handle_db_commit(db.session)
         if error:
             return {'error': 'Failed to create event: ' + error[0]}, error[1]
+        invalidate_event(content=True)
         return event.to_dict(), 201
 
-    @jwt_required()
+    # Partial update in one UPDATE ... RETURNING. With If-Match the update only
+    # applies if the event still has the version (and, when number_of_tickets
+    # is being set, the ticket count) the client read; otherwise 412.
+    @admin_required
     def patch(self):
-        if not request.user.get('is_admin', False):
-            return {'error': 'Admin privileges required'}, 403
-
         data = request.json
         id = data.get('id')
         if id is None:
             return {'error': 'Missing event ID'}, 400
 
-        event = Event.query.get(id)
-        if event is None:
-            return {'error': 'Event not found'}, 404
-
-        if 'name' in data:
-            event.name = data['name']
-        if 'image' in data:
-            event.image = data['image']
-        if 'datetime' in data:
-            event.datetime = data['datetime']
-        if 'location' in data:
-            event.location = data['location']
-        if 'description' in data:
-            event.description = data['description']
-        if 'capacity' in data:
-            event.capacity = data['capacity']
-        if 'number_of_tickets' in data:
-            event.number_of_tickets = data['number_of_tickets']
-
-        error = handle_db_commit(db.session)
+        values, error = clean_event(data, partial=True)
+        if error is None and not values:
+            error = 'No fields to update'
         if error:
-            return {'error': 'Failed to update event: ' + error[0]}, error[1]
-        return event.to_dict(), 200
+            return {'error': error}, 400
+
+        stmt = update(Event).where(Event.id == id)
+        if request.if_match and not request.if_match.star_tag:
+            # Weak tags are accepted: compression weakens the tag, but the
+            # version and ticket count it carries are exact
+            expected = [parse_event_etag(id, etag) for etag in request.if_match.as_set(include_weak=True)]
+            expected = [tag for tag in expected if tag is not None]
+            if not expected:
+                return {'error': 'Event has changed'}, 412
+            stmt = stmt.where(or_(*[
+                and_(Event.version == version, Event.number_of_tickets == number_of_tickets)
+                if 'number_of_tickets' in values else Event.version == version
+                for version, number_of_tickets in expected
+            ]))
+
+        serializer = serializer_for(Event)
+        stmt = (
+            stmt.values(**values, version=Event.version + 1)
+            .returning(*serializer.columns)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            row = db.session.execute(stmt).first()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to update event: ' + str(e)}, 500
+
+        if row is None:
+            if not event_exists(id):
+                return {'error': 'Event not found'}, 404
+            return {'error': 'Event has changed'}, 412
+        invalidate_event(id, content=True)
+        event = serializer.serialize(row)
+        publish_availability(id, event['number_of_tickets'])
+        return event, 200, {'ETag': f'"{event_etag(event)}"'}
     
-    @jwt_required()
+    @admin_required
     def delete(self):
-        if not request.user.get('is_admin', False):
-            return {'error': 'Admin privileges required'}, 403
-
         data = request.json
         id = data.get('id')
         if id is None:
@@ -217,44 +315,174 @@ class Events(Resource):
         error = handle_db_commit(db.session)
         if error:
             return {'error': 'Failed to delete event: ' + error[0]}, error[1]
+        invalidate_event(id, content=True)
         return {'message': 'Event deleted successfully'}, 200
 
+class EventSearch(Resource):
+    # ?q= terms (prefix matched), optional lat/lng/radius_km, limit,
+    # include_archived
+    def get(self):
+        args = request.args
+        q = args.get('q', '').strip()
+        if not q:
+            return {'error': 'Missing search query'}, 400
+        limit = parse_limit(args.get('limit'), 10, current_app.config['SEARCH_MAX_RESULTS'])
+        if limit is None:
+            return {'error': 'Invalid limit'}, 400
+
+        near = None
+        if any(args.get(name) for name in ('lat', 'lng', 'radius_km')):
+            try:
+                near = (float(args['lat']), float(args['lng']), float(args['radius_km']))
+            except (KeyError, ValueError):
+                return {'error': 'lat, lng and radius_km must all be numbers'}, 400
+
+        ranked = search_events(
+            q, limit, near, event_content_generation(), current_app.config['SEARCH_INDEX_MAX_AGE'], include_archived()
+        )
+        if not ranked:
+            return [], 200
+
+        serializer = serializer_for(Event)
+        ids = [event_id for event_id, _ in ranked]
+        rows = db.session.execute(serializer.select().where(Event.id.in_(ids))).all()
+        events = {event['id']: event for event in serializer.all(rows)}
+        return [dict(events[event_id], rank=float(rank)) for event_id, rank in ranked if event_id in events], 200
+
+class EventsBulk(Resource):
+    def _run(self, operation):
+        items = parse_items(request)
+        if items is None:
+            return {'error': 'Expected a JSON array or NDJSON body'}, 400
+        if len(items) > current_app.config['BULK_MAX_ITEMS']:
+            return {'error': f"At most {current_app.config['BULK_MAX_ITEMS']} items per request"}, 413
+
+        results = operation(items, current_app.config['BULK_CHUNK_SIZE'])
+        succeeded = [result['id'] for result in results if 'error' not in result]
+        if succeeded:
+            invalidate_events([] if operation is create_events else succeeded, content=True)
+        return {'results': results, 'succeeded': len(succeeded), 'failed': len(results) - len(succeeded)}, 200
+
+    @admin_required
+    def post(self):
+        return self._run(create_events)
+
+    @admin_required
+    def patch(self):
+        return self._run(update_events)
+
+    @admin_required
+    def delete(self):
+        return self._run(delete_events)
+
+class EventDetail(Resource):
+    def get(self, event_id):
+        def load():
+            serializer = serializer_for(Event)
+            row = db.session.execute(serializer.select().where(Event.id == event_id)).first()
+            return (serializer.serialize(row) if row else None), {}
+
+        entry = cached(event_key(event_id), load, etag=event_etag)
+        if entry['data'] is None:
+            return {'error': 'Event not found'}, 404
+        return respond(entry)
+
 class UserEvents(Resource):
     def get(self):
-        user_events = UserEvent.query.all()
-        return [user_event.to_dict() for user_event in user_events], 200
+        serializer = serializer_for(UserEvent)
+        statement = with_archive(UserEvent, UserEventArchive)
+        format = stream_format()
+        if format:
+            return stream_rows(serializer, statement, format)
+        return serializer.all(db.session.execute(statement)), 200
+
+    # Register the current user for an event
+    @login_required
+    def post(self):
+        event_id = request.json.get('event_id')
+        if not event_id:
+            return {'error': 'Missing event_id'}, 400
+        event = db.session.execute(select(Event.archived_at).where(Event.id == event_id)).first()
+        if event is None:
+            return {'error': 'Event not found'}, 404
+        if event.archived_at is not None:
+            return {'error': 'Event has ended'}, 409
 
-    def get_user_events(self, user_id):
-        user = User.query.get(user_id)
-        if not user:
+        user_event = UserEvent(user_id=request.user['id'], event_id=event_id)
+        db.session.add(user_event)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return {'error': 'Already registered for this event'}, 409
+        record_registration(event_id)
+        error = handle_db_commit(db.session)
+        if error:
+            return {'error': 'Failed to register: ' + error[0]}, error[1]
+        return user_event.to_dict(), 201
+
+class UserRegisteredEvents(Resource):
+    # Events a user is registered for, resolved in one joined query; archived
+    # registrations are included with ?include_archived=true
+    def get(self, user_id):
+        limit = parse_limit(request.args.get('limit'), current_app.config['EVENTS_PAGE_SIZE'], current_app.config['EVENTS_MAX_PAGE_SIZE'])
+        if limit is None:
+            return {'error': 'Invalid limit'}, 400
+
+        serializer = serializer_for(Event)
+        if include_archived():
+            registrations = union_all(
+                select(UserEvent.event_id).where(UserEvent.user_id == user_id),
+                select(UserEventArchive.event_id).where(UserEventArchive.user_id == user_id),
+            ).subquery()
+            query = serializer.select().join(registrations, registrations.c.event_id == Event.id)
+        else:
+            query = serializer.select().join(UserEvent, UserEvent.event_id == Event.id).where(UserEvent.user_id == user_id)
+        if request.args.get('cursor'):
+            cursor = decode_cursor(request.args['cursor'])
+            if cursor is None:
+                return {'error': 'Invalid cursor'}, 400
+            query = query.where(tuple_(Event.datetime, Event.id) > cursor)
+
+        events, headers = event_page(serializer, query, limit)
+        # An empty page is the only case that needs to tell "no such user" apart
+        if not events and not request.args.get('cursor') and db.session.get(User, user_id) is None:
             return {'error': 'User not found'}, 404
-        
-        user_events = UserEvent.query.filter_by(user_id=user_id).all()
-        events = [user_event.event.to_dict() for user_event in user_events]
-        return events, 200
+        return events, 200, headers
 
 class Tickets(Resource):
     def get(self):
-        tickets = Ticket.query.all()
-        return [ticket.to_dict() for ticket in tickets], 200
-
-    @jwt_required()
+        serializer = serializer_for(Ticket)
+        statement = with_archive(Ticket, TicketArchive)
+        format = stream_format()
+        if format:
+            return stream_rows(serializer, statement, format)
+        return serializer.all(db.session.execute(statement)), 200
+
+    @login_required
     def post(self):
-        if not request.user:
-            return {'error': 'User not authenticated'}, 401
-
         data = request.json
         event_id = data.get('event_id')
         phone_number = data.get('phone_number')
 
         if not event_id or not phone_number:
             return {'error': 'Missing event_id or phone_number'}, 400
-
-        event = Event.query.get(event_id)
-        if not event:
-            return {'error': 'Event not found'}, 404
-
-        if event.capacity <= 0 or event.number_of_tickets <= 0:
+        try:
+            event_id = int(event_id)
+        except (TypeError, ValueError):
+            return {'error': 'Invalid event_id'}, 400
+
+        if current_app.config['QUEUED_PURCHASES'] or request.headers.get('Prefer') == 'respond-async':
+            return self.enqueue(event_id, phone_number)
+
+        # Guarded decrement: never read-modify-write the counter in Python
+        remaining = reserve_tickets(event_id)
+        if remaining is None:
+            db.session.rollback()
+            if not event_exists(event_id):
+                return {'error': 'Event not found'}, 404
+            if has_seat_map(event_id):
+                return {'error': 'Event has reserved seating; hold seats to buy tickets'}, 409
             return {'error': 'No tickets available'}, 400
 
         ticket = Ticket(
@@ -263,20 +491,368 @@ class Tickets(Resource):
             phone_number=phone_number
         )
 
-        event.number_of_tickets -= 1
+        db.session.add(ticket)
+        db.session.flush()
+        record_ticket_sale(event_id, ticket.price)
         error = handle_db_commit(db.session)
         if error:
             return {'error': 'Failed to purchase ticket: ' + error[0]}, error[1]
+        invalidate_event(event_id)
+        publish_availability(event_id, remaining)
 
-        return {'message': 'Ticket purchased successfully'}, 200
+        return {'message': 'Ticket purchased successfully', 'remaining_tickets': remaining}, 200
+
+    # Queued mode: record the order and let a worker complete it
+    def enqueue(self, event_id, phone_number):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return {'error': 'Missing Idempotency-Key header'}, 400
+        if not event_exists(event_id):
+            return {'error': 'Event not found'}, 404
+
+        order, created = enqueue_order(request.user['id'], key, event_id, phone_number)
+        if order is None:
+            return {'error': 'Failed to queue order'}, 500
+        if order.event_id != event_id:
+            return {'error': 'Idempotency-Key was already used for a different order'}, 422
+        return order.to_dict(), 202 if created else 200, {'Location': f'/orders/{order.id}'}
+
+class EventSeats(Resource):
+    # Availability bitmap: base64, one bit per seat in row-major order, most
+    # significant bit first, 1 = available
+    def get(self, event_id):
+        seat_map = seat_availability(event_id)
+        if seat_map is None:
+            return {'error': 'Seat map not found'}, 404
+        etag = f"{event_id}.{seat_map['version']}"
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        return seat_map, 200, {'ETag': f'"{etag}"'}
+
+    @admin_required
+    def post(self, event_id):
+        data = request.json
+        rows, seats_per_row = data.get('rows'), data.get('seats_per_row')
+        if not isinstance(rows, int) or not isinstance(seats_per_row, int) or rows < 1 or seats_per_row < 1:
+            return {'error': 'rows and seats_per_row must be positive integers'}, 400
+        if rows * seats_per_row > current_app.config['SEAT_MAP_MAX_SEATS']:
+            return {'error': f"At most {current_app.config['SEAT_MAP_MAX_SEATS']} seats per event"}, 400
+        if not event_exists(event_id):
+            return {'error': 'Event not found'}, 404
+
+        try:
+            create_seat_map(event_id, rows, seats_per_row)
+        except SeatError as e:
+            db.session.rollback()
+            return {'error': str(e)}, e.status
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Failed to create seat map: ' + str(e)}, 500
+        invalidate_event(event_id)
+        return seat_availability(event_id), 201
+
+class EventHolds(Resource):
+    @login_required
+    def post(self, event_id):
+        seats = request.json.get('seats')
+        if not isinstance(seats, list) or not seats:
+            return {'error': 'Missing seats'}, 400
+        if len(seats) > current_app.config['SEAT_HOLD_MAX_SEATS']:
+            return {'error': f"At most {current_app.config['SEAT_HOLD_MAX_SEATS']} seats per hold"}, 400
+
+        try:
+            hold = place_hold(event_id, request.user['id'], seats, current_app.config['SEAT_HOLD_SECONDS'])
+        except SeatError as e:
+            return {'error': str(e)}, e.status
+        return hold.to_dict(), 201, {'Location': f'/holds/{hold.id}'}
+
+class HoldDetail(Resource):
+    @login_required
+    def get(self, hold_id):
+        hold = own_hold(hold_id)
+        if hold is None:
+            return {'error': 'Hold not found'}, 404
+        return hold.to_dict(), 200
+
+    @login_required
+    def delete(self, hold_id):
+        hold = own_hold(hold_id)
+        if hold is None:
+            return {'error': 'Hold not found'}, 404
+        try:
+            release_hold(hold)
+        except SeatError as e:
+            return {'error': str(e)}, e.status
+        return {'message': 'Hold released'}, 200
+
+class HoldPurchase(Resource):
+    @login_required
+    def post(self, hold_id):
+        phone_number = request.json.get('phone_number')
+        if not phone_number:
+            return {'error': 'Missing phone_number'}, 400
+        hold = own_hold(hold_id)
+        if hold is None:
+            return {'error': 'Hold not found'}, 404
+
+        try:
+            tickets, remaining = purchase_hold(hold, request.user['id'], phone_number)
+        except SeatError as e:
+            return {'error': str(e)}, e.status
+        except IntegrityError:
+            return {'error': 'Seats already sold'}, 409
+        invalidate_event(hold.event_id)
+        publish_availability(hold.event_id, remaining)
+        return {'tickets': [{'id': id, 'seat': seat} for id, seat in tickets]}, 201
+
+class Orders(Resource):
+    # ?wait=N long-polls up to N seconds for a pending order to complete
+    @login_required
+    def get(self, order_id):
+        order = db.session.get(Order, order_id)
+        if order is None or (order.user_id != request.user['id'] and not request.user['is_admin']):
+            return {'error': 'Order not found'}, 404
+
+        try:
+            wait = min(float(request.args.get('wait', 0)), current_app.config['ORDER_MAX_WAIT'])
+        except ValueError:
+            return {'error': 'Invalid wait'}, 400
+        if wait > 0:
+            order = wait_for_order(order, wait)
+        return order.to_dict(), 200
+
+class EventAvailability(Resource):
+    # Server-sent events with the event's remaining tickets
+    def get(self, event_id):
+        response, status = availability_stream(event_id)
+        if status == 404:
+            return {'error': 'Event not found'}, 404
+        if status == 503:
+            return {'error': 'Too many open streams, please retry shortly'}, 503, {'Retry-After': '5'}
+        return response
+
+class EventStatistics(Resource):
+    def get(self, event_id):
+        stats = event_stats(event_id)
+        if stats is None:
+            return {'error': 'Event not found'}, 404
+        return stats, 200
+
+class AdminDashboard(Resource):
+    @admin_required
+    def get(self):
+        top = parse_limit(request.args.get('top'), 10, 100)
+        if top is None:
+            return {'error': 'Invalid top'}, 400
+        return dashboard(top), 200
+
+class AdminExport(Resource):
+    # ?format=csv (default) or ndjson
+    @admin_required
+    def get(self, table):
+        if table not in TABLES:
+            return {'error': 'Unknown table'}, 404
+        format = request.args.get('format', 'csv')
+        if format not in ('csv', 'ndjson'):
+            return {'error': 'format must be csv or ndjson'}, 400
+        return export_table(table, format)
+
+class AdminImport(Resource):
+    # Body is text/csv with a header row, or application/x-ndjson
+    @admin_required
+    def post(self, table):
+        if table not in TABLES:
+            return {'error': 'Unknown table'}, 404
+        if request.mimetype not in ('text/csv', 'application/x-ndjson'):
+            return {'error': 'Expected a text/csv or application/x-ndjson body'}, 415
+
+        start = time.perf_counter()
+        try:
+            count = import_table(table, request.stream, request.mimetype, current_app.config['IMPORT_CHUNK_ROWS'])
+        except TransferError as e:
+            return {'error': str(e)}, 400
+        except IntegrityError as e:
+            return {'error': 'Import rejected: ' + str(e.orig)}, 409
+        except Exception as e:
+            return {'error': 'Failed to import: ' + str(e)}, 500
+        seconds = time.perf_counter() - start
+
+        rebuild_event_stats()
+        invalidate_events([])
+        return {'imported': count, 'seconds': round(seconds, 3), 'rows_per_second': round(count / seconds) if seconds else None}, 200
+
+class Stats(Resource):
+    def get(self):
+        stats = {'cache': cache_stats(), 'pool': pool_stats(db.engine)}
+        replicas = replica_stats()
+        if replicas is not None:
+            stats['replicas'] = replicas
+        return stats, 200
+
+# Order queue worker: flask process-orders
+@click.command('process-orders')
+@click.option('--batch-size', default=None, type=int)
+@click.option('--once', is_flag=True, help='Process a single batch and exit.')
+@with_appcontext
+def process_orders_command(batch_size, once):
+    batch_size = batch_size or current_app.config['ORDER_BATCH_SIZE']
+    if once:
+        click.echo(f'Processed {process_orders(batch_size)} orders')
+        return
+    run_order_worker(current_app._get_current_object(), batch_size, current_app.config['ORDER_POLL_INTERVAL'])
+
+# Rebuild per-event aggregates from tickets and registrations: flask rebuild-stats
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    click.echo(f'Rebuilt stats for {rebuild_event_stats()} events')
+
+# Release expired seat holds: flask sweep-holds
+@click.command('sweep-holds')
+@click.option('--once', is_flag=True, help='Sweep once and exit.')
+@with_appcontext
+def sweep_holds_command(once):
+    while True:
+        released = sweep_holds()
+        if once:
+            click.echo(f'Released {released} holds')
+            return
+        time.sleep(current_app.config['SEAT_SWEEP_INTERVAL'])
+
+# Move past events' tickets and registrations to the archive tables:
+# flask archive-events
+@click.command('archive-events')
+@click.option('--days', default=None, type=int, help='Archive events older than this many days.')
+@with_appcontext
+def archive_events_command(days):
+    days = current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    events, tickets, registrations = archive_events(archive_cutoff(days), current_app.config['ARCHIVE_BATCH_SIZE'])
+    click.echo(f'Archived {events} events, {tickets} tickets, {registrations} registrations')
+
+def register_resources(api):
+    api.add_resource(Home, '/')
+    api.add_resource(Users, '/users')
+    api.add_resource(Login, '/login')
+    api.add_resource(Logout, '/logout')
+    api.add_resource(Events, '/events')
+    api.add_resource(EventSearch, '/events/search')
+    api.add_resource(EventsBulk, '/events/bulk')
+    api.add_resource(EventDetail, '/events/<int:event_id>')
+    api.add_resource(EventAvailability, '/events/<int:event_id>/availability/stream')
+    api.add_resource(EventStatistics, '/events/<int:event_id>/stats')
+    api.add_resource(UserEvents, '/user_events')
+    api.add_resource(UserRegisteredEvents, '/users/<int:user_id>/events')
+    api.add_resource(Tickets, '/tickets')
+    api.add_resource(EventSeats, '/events/<int:event_id>/seats')
+    api.add_resource(EventHolds, '/events/<int:event_id>/holds')
+    api.add_resource(HoldDetail, '/holds/<int:hold_id>')
+    api.add_resource(HoldPurchase, '/holds/<int:hold_id>/purchase')
+    api.add_resource(Orders, '/orders/<int:order_id>')
+    api.add_resource(Stats, '/stats')
+    api.add_resource(AdminDashboard, '/admin/stats')
+    api.add_resource(AdminExport, '/admin/export/<string:table>')
+    api.add_resource(AdminImport, '/admin/import/<string:table>')
+
+# Start the optional in-process order worker on the first request, so that
+# under a preloading server it runs in each forked worker, not the master
+def start_order_worker_on_first_request(app):
+    started = threading.Event()
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_order_worker():
+        if started.is_set():
+            return
+        with lock:
+            if not started.is_set():
+                threading.Thread(
+                    target=run_order_worker,
+                    args=(app, app.config['ORDER_BATCH_SIZE'], app.config['ORDER_POLL_INTERVAL']),
+                    daemon=True
+                ).start()
+                started.set()
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+    app.config.setdefault(
+        'SQLALCHEMY_ENGINE_OPTIONS',
+        engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    )
+
+    # Trust X-Forwarded-* from PROXY_HOPS proxies, so anonymous clients are
+    # rate limited by their own address rather than the proxy's
+    if app.config['PROXY_HOPS']:
+        hops = app.config['PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+    # Initialize CORS
+    CORS(app, expose_headers=['X-Next-Cursor', 'ETag', 'Last-Modified', 'Retry-After'])
+
+    # Initialize request and SQL metrics (first, so they cover every other
+    # before_request hook, authentication included)
+    init_metrics(app)
+
+    # Initialize JWT Manager
+    jwt.init_app(app)
+    init_auth(app, jwt)
+
+    # Initialize database
+    db.init_app(app)
+    with app.app_context():
+        install_pool_metrics(db.engine, app.config)
+
+    # Initialize response compression
+    init_compression(app)
+
+    # Initialize rate limits and the concurrency limiter (after auth, so
+    # limits can be keyed by user)
+    init_rate_limits(app)
+
+    # Initialize read replica routing (after auth, for read-your-writes)
+    init_replicas(app)
+
+    # Initialize the event read cache
+    init_cache(app)
+
+    # Initialize live availability streams
+    init_availability(app)
+
+    # Initialize the password hashing pool
+    init_hashing(app)
+
+    # Initialize Flask-Migrate
+    migrate.init_app(app, db)
+
+    # Initialize Flask-RESTful API
+    api = Api(app, decorators=[primary_fallback])
+    if orjson is not None:
+        api.representation('application/json')(output_json)
+    register_resources(api)
+
+    app.cli.add_command(process_orders_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(sweep_holds_command)
+    app.cli.add_command(archive_events_command)
+    if app.config['ORDER_WORKER_THREAD']:
+        start_order_worker_on_first_request(app)
+
+    # Configure logging
+    if not app.debug and app.config['LOG_FILE']:
+        handler = RotatingFileHandler(
+            app.config['LOG_FILE'],
+            maxBytes=app.config['LOG_MAX_BYTES'],
+            backupCount=app.config['LOG_BACKUP_COUNT']
+        )
+        handler.setLevel(logging.INFO)
+        formatter = logging.Formatter(
+            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+        )
+        handler.setFormatter(formatter)
+        app.logger.addHandler(handler)
 
-# Register resources with the API
-api.add_resource(Home, '/')
-api.add_resource(Users, '/users')
-api.add_resource(Login, '/login')
-api.add_resource(Events, '/events')
-api.add_resource(UserEvents, '/user_events')
-api.add_resource(Tickets, '/tickets')
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=os.getenv('FLASK_DEBUG', 'true').lower() == 'true')
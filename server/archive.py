@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, literal, select, text, update
+from models import db, Event, Order, SeatHold, Ticket, TicketArchive, UserEvent, UserEventArchive
+from cache import invalidate_events
+
+# Archival of past events. Once an event is ARCHIVE_AFTER_DAYS in the past its
+# tickets and registrations move from the hot tables to tickets_archive and
+# user_events_archive, and the event is stamped with archived_at. The hot
+# tables then only hold rows that can still change, and listings skip archived
+# events through a partial index.
+#
+# On Postgres the archive tables are range-partitioned by event date, one
+# partition per year, created here on demand. Other databases get plain tables.
+#
+# Each batch of events moves in one transaction. Orders are kept, since they
+# hold the buyers' idempotency records: pending ones fail with "Event has
+# ended", and completed ones keep their ticket_id, which then refers to the
+# ticket's row in tickets_archive (archived rows keep their ids). Seat holds
+# for those events are deleted; event_stats is left as is, so sales figures
+# for archived events stay available.
+
+def _ensure_partitions(years):
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in (TicketArchive.__tablename__, UserEventArchive.__tablename__):
+        for year in years:
+            db.session.execute(text(
+                f'CREATE TABLE IF NOT EXISTS {table}_{year} PARTITION OF {table} '
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            ))
+
+def _move(source, archive, event_ids, now):
+    columns = [column.name for column in source.__table__.columns]
+    rows = (
+        select(*[source.__table__.c[name] for name in columns], Event.datetime, literal(now))
+        .join(Event, Event.id == source.event_id)
+        .where(source.event_id.in_(event_ids))
+    )
+    db.session.execute(insert(archive).from_select(columns + ['event_datetime', 'archived_at'], rows))
+    return db.session.execute(delete(source).where(source.event_id.in_(event_ids))).rowcount
+
+# Archive events that started before `before`; returns (events, tickets,
+# registrations) moved
+def archive_events(before, batch_size=100):
+    totals = [0, 0, 0]
+    while True:
+        events = db.session.execute(
+            select(Event.id, Event.datetime)
+            .where(Event.datetime < before, Event.archived_at.is_(None))
+            .order_by(Event.datetime)
+            .limit(batch_size)
+        ).all()
+        if not events:
+            return tuple(totals)
+
+        event_ids = [event.id for event in events]
+        now = datetime.utcnow()
+        try:
+            _ensure_partitions({event.datetime.year for event in events})
+            db.session.execute(
+                update(Order).where(Order.event_id.in_(event_ids), Order.status == 'pending')
+                .values(status='failed', error='Event has ended', processed_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(delete(SeatHold).where(SeatHold.event_id.in_(event_ids)))
+            tickets = _move(Ticket, TicketArchive, event_ids, now)
+            registrations = _move(UserEvent, UserEventArchive, event_ids, now)
+            db.session.execute(
+                update(Event).where(Event.id.in_(event_ids)).values(archived_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        # Content, so the search index drops them too
+        invalidate_events(event_ids, content=True)
+        totals[0] += len(event_ids)
+        totals[1] += tickets
+        totals[2] += registrations
+
+def archive_cutoff(days):
+    return datetime.utcnow() - timedelta(days=days)
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.algorithms import get_default_algorithms
+from jwt.exceptions import PyJWTError
+from sqlalchemy import select
+from models import db, RevokedToken
+
+# Stateless auth: the access token carries the user's id, username and
+# is_admin/is_active flags, so a request is authorized from the token alone.
+# The token is verified once per request in a before_request hook and the
+# claims are left on request.user for the login_required/admin_required
+# decorators.
+#
+# Revoked token ids live in the revoked_tokens table. Each worker keeps them
+# in a Bloom filter refreshed every REVOCATION_REFRESH_SECONDS; tokens that
+# miss the filter (almost all of them) are accepted with no database access,
+# and only filter hits are confirmed against the table.
+
+class BloomFilter:
+    def __init__(self, bits=1 << 20, hashes=7):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray(bits // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'little')
+        b = int.from_bytes(digest[8:], 'little') | 1
+        return [(a + i * b) % self.bits for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class RevocationList:
+    def __init__(self, bits, hashes, refresh_seconds):
+        self.bits = bits
+        self.hashes = hashes
+        self.refresh_seconds = refresh_seconds
+        self.filter = BloomFilter(bits, hashes)
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        bloom = BloomFilter(self.bits, self.hashes)
+        for jti in db.session.scalars(select(RevokedToken.jti).where(RevokedToken.expires_at > now)):
+            bloom.add(jti)
+        self.filter = bloom
+        self.refreshed_at = time.monotonic()
+
+    def is_revoked(self, jti):
+        if time.monotonic() - self.refreshed_at > self.refresh_seconds:
+            with self._lock:
+                if time.monotonic() - self.refreshed_at > self.refresh_seconds:
+                    self.refresh()
+        if jti not in self.filter:
+            return False
+        return db.session.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti)) is not None
+
+    def revoke(self, jti, expires_at):
+        db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+        self.filter.add(jti)
+
+revocations = None
+
+def init_auth(app, jwt):
+    global revocations
+    revocations = RevocationList(
+        app.config.get('REVOCATION_BLOOM_BITS', 1 << 20),
+        app.config.get('REVOCATION_BLOOM_HASHES', 7),
+        app.config.get('REVOCATION_REFRESH_SECONDS', 30),
+    )
+
+    # Prepare the verification key once; for RS/ES algorithms this avoids
+    # parsing the PEM key on every request
+    algorithm = app.config.get('JWT_ALGORITHM', 'HS256')
+    key = app.config.get('JWT_PUBLIC_KEY') if algorithm[:2] in ('RS', 'ES', 'PS') else app.config.get('JWT_SECRET_KEY')
+    verification_key = get_default_algorithms()[algorithm].prepare_key(key) if key else key
+
+    @jwt.decode_key_loader
+    def decode_key(jwt_header, jwt_data):
+        return verification_key
+
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_data):
+        return revocations.is_revoked(jwt_data['jti'])
+
+    @app.before_request
+    def load_current_user():
+        request.user = None
+        if not request.headers.get('Authorization'):
+            return
+        try:
+            verify_jwt_in_request(optional=True)
+        except (JWTExtendedException, PyJWTError):
+            return
+        claims = get_jwt()
+        if claims:
+            request.user = {
+                'id': int(claims['sub']),
+                'username': claims.get('username'),
+                'is_admin': claims.get('is_admin', False),
+                'is_active': claims.get('is_active', True),
+                'jti': claims['jti'],
+                'exp': claims.get('exp'),
+            }
+
+# Claims embedded in access tokens at login
+def user_claims(user):
+    return {'username': user.username, 'is_admin': bool(user.is_admin), 'is_active': user.is_active is not False}
+
+def login_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.user is None:
+            return {'error': 'User not authenticated'}, 401
+        if not request.user['is_active']:
+            return {'error': 'Account is inactive'}, 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+def admin_required(fn):
+    @wraps(fn)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if not request.user['is_admin']:
+            return {'error': 'Admin privileges required'}, 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+def revoke_current_token():
+    if request.user['exp'] is None:
+        expires_at = datetime.max
+    else:
+        expires_at = datetime.fromtimestamp(request.user['exp'], timezone.utc).replace(tzinfo=None)
+    revocations.revoke(request.user['jti'], expires_at)
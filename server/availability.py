@@ -0,0 +1,223 @@
+import json
+import threading
+import time
+from flask import Response, stream_with_context
+from sqlalchemy import select
+from models import db, Event
+from redis_client import redis, redis_for
+
+# Live remaining-ticket counts pushed over server-sent events.
+#
+# Writers call publish_availability(event_id, remaining) after committing. Each
+# process keeps one channel per watched event holding only the latest count,
+# so a burst of sales collapses into whatever the value is when a stream next
+# wakes up; streams send at most AVAILABILITY_MAX_RATE updates per second.
+#
+# With Redis configured, publishes go through Redis pub/sub and a listener
+# thread in every worker feeds its local channels, so a sale in one worker
+# reaches streams in all of them. Without it, streams also re-read the count
+# every AVAILABILITY_POLL_SECONDS, which catches writes made by other workers
+# and processes (the order worker, bulk updates) at one query per interval.
+#
+# Config (read from the app by init_availability):
+#   AVAILABILITY_URL           redis:// URL for cross-worker fan-out, overriding
+#                              REDIS_URL
+#   AVAILABILITY_MAX_RATE      updates per second per stream
+#   AVAILABILITY_POLL_SECONDS  fallback re-read interval; also the heartbeat
+#   AVAILABILITY_STREAM_SECONDS  streams close after this; EventSource reconnects
+#   AVAILABILITY_MAX_STREAMS   open streams per process before 503s
+
+CHANNEL = 'epic:availability'
+
+class Channel:
+    def __init__(self):
+        self.value = None
+        self.seq = 0
+        self.subscribers = 0
+        self.condition = threading.Condition()
+
+    def publish(self, value):
+        with self.condition:
+            if value != self.value:
+                self.value = value
+                self.seq += 1
+                self.condition.notify_all()
+
+    # Block until the value moves past seq or timeout; returns (seq, value)
+    def wait(self, seq, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq != seq, timeout)
+            return self.seq, self.value
+
+    def latest(self):
+        with self.condition:
+            return self.seq, self.value
+
+class Broker:
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+        self.streams = 0
+
+    # Take a stream slot before responding, so concurrent requests can't all
+    # pass the limit; False when max_streams are already open
+    def reserve(self, max_streams):
+        with self._lock:
+            if self.streams >= max_streams:
+                return False
+            self.streams += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.streams -= 1
+
+    def subscribe(self, event_id):
+        with self._lock:
+            channel = self._channels.get(event_id)
+            if channel is None:
+                channel = self._channels[event_id] = Channel()
+            channel.subscribers += 1
+            return channel
+
+    def unsubscribe(self, event_id):
+        with self._lock:
+            channel = self._channels[event_id]
+            channel.subscribers -= 1
+            if not channel.subscribers:
+                del self._channels[event_id]
+
+    # Local delivery; events nobody is watching are dropped
+    def deliver(self, event_id, remaining):
+        channel = self._channels.get(event_id)
+        if channel is not None:
+            channel.publish(remaining)
+
+    def publish(self, event_id, remaining):
+        self.deliver(event_id, remaining)
+
+class RedisBroker(Broker):
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self._listener = None
+
+    def publish(self, event_id, remaining):
+        self.client.publish(CHANNEL, json.dumps([event_id, remaining]))
+
+    def subscribe(self, event_id):
+        # Started lazily so it runs in each forked worker, not the master
+        if self._listener is None:
+            with self._lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(target=self._listen, daemon=True)
+                    self._listener.start()
+        return super().subscribe(event_id)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for message in pubsub.listen():
+                    event_id, remaining = json.loads(message['data'])
+                    self.deliver(event_id, remaining)
+            except redis.RedisError:
+                # Polling covers the gap until the connection is back
+                time.sleep(1)
+
+broker = Broker()
+_settings = {
+    'max_rate': 2.0,
+    'poll_seconds': 5.0,
+    'stream_seconds': 300.0,
+    'max_streams': 100,
+}
+
+def init_availability(app):
+    global broker
+    _settings.update(
+        max_rate=app.config.get('AVAILABILITY_MAX_RATE', 2.0),
+        poll_seconds=app.config.get('AVAILABILITY_POLL_SECONDS', 5.0),
+        stream_seconds=app.config.get('AVAILABILITY_STREAM_SECONDS', 300.0),
+        max_streams=app.config.get('AVAILABILITY_MAX_STREAMS', 100),
+    )
+    client = redis_for(app, 'AVAILABILITY_URL')
+    if client is not None:
+        broker = RedisBroker(client)
+    else:
+        broker = Broker()
+
+def publish_availability(event_id, remaining):
+    try:
+        broker.publish(event_id, remaining)
+    except Exception:
+        # A lost update is corrected by the streams' next poll
+        pass
+
+def _remaining(event_id):
+    remaining = db.session.execute(select(Event.number_of_tickets).where(Event.id == event_id)).scalar_one_or_none()
+    # Don't hold a pooled connection while the stream sleeps
+    db.session.close()
+    return remaining
+
+def _message(seq, event_id, remaining):
+    data = json.dumps({'event_id': event_id, 'remaining_tickets': remaining})
+    return f'id: {seq}\nevent: availability\ndata: {data}\n\n'
+
+# Returns (response, 200), or (None, status) when the event doesn't exist or
+# too many streams are already open
+def availability_stream(event_id):
+    remaining = _remaining(event_id)
+    if remaining is None:
+        return None, 404
+    if not broker.reserve(_settings['max_streams']):
+        return None, 503
+
+    # Released once: when the generator finishes, or on close if it never ran
+    slot = [True]
+    def release():
+        if slot and slot.pop():
+            broker.release()
+
+    def generate():
+        channel = broker.subscribe(event_id)
+        try:
+            # A channel other streams already watch may hold a newer value
+            if channel.value is None:
+                channel.publish(remaining)
+            seq, value = channel.latest()
+            min_interval = 1 / _settings['max_rate']
+            deadline = time.monotonic() + _settings['stream_seconds']
+            yield f"retry: {int(_settings['poll_seconds'] * 1000)}\n" + _message(seq, event_id, value)
+            last_sent = time.monotonic()
+            while time.monotonic() < deadline:
+                new_seq, value = channel.wait(seq, _settings['poll_seconds'])
+                if new_seq == seq:
+                    # Nothing published locally: re-read in case another
+                    # worker changed it, and keep the connection alive
+                    channel.publish(_remaining(event_id))
+                    new_seq, value = channel.latest()
+                    if new_seq == seq:
+                        yield ': keepalive\n\n'
+                        continue
+                # Coalesce: anything published while we wait out the rate
+                # limit is folded into the one message sent after it
+                delay = min_interval - (time.monotonic() - last_sent)
+                if delay > 0:
+                    time.sleep(delay)
+                    new_seq, value = channel.latest()
+                if value is None:
+                    # The event was deleted
+                    return
+                seq = new_seq
+                last_sent = time.monotonic()
+                yield _message(seq, event_id, value)
+        finally:
+            broker.unsubscribe(event_id)
+            release()
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+    response.call_on_close(release)
+    return response, 200
@@ -0,0 +1,39 @@
+# Password verification throughput, inline versus the hashing pool.
+#
+#   cd server && python -m benchmarks.hashing [method] [requests]
+#
+# Verifications are submitted from a thread pool the size of the hashing pool,
+# the way concurrent login requests would arrive.
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+import hashing
+
+def run(method, workers, requests):
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_METHOD=method, HASH_WORKERS=workers, HASH_QUEUE_SIZE=max(workers, 1) * 4)
+    hashing.init_hashing(app)
+    stored = hashing.hash_password('correct horse battery staple')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as threads:
+        results = list(threads.map(lambda _: hashing.verify_password(stored, 'correct horse battery staple'), range(requests)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+
+    rate = requests / elapsed
+    cores = max(workers, 1)
+    label = 'inline' if workers == 0 else f'{workers} procs'
+    print(f'{label:>10}  {rate:8.1f} logins/s  {rate / cores:8.1f} logins/s/core')
+
+if __name__ == '__main__':
+    method = sys.argv[1] if len(sys.argv) > 1 else 'scrypt'
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f'method={method} requests={requests}')
+    run(method, 0, requests)
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        run(method, workers, requests)
+        workers *= 2
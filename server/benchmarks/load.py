@@ -0,0 +1,170 @@
+# Concurrent load generator for the REST API.
+#
+#   cd server && python -m benchmarks.load --url http://127.0.0.1:8000 \
+#       --concurrency 8 --duration 10 --output results.json \
+#       --baseline benchmarks/baselines/sqlite-gthread-1x8.json
+#
+# Seed the target first with benchmarks.seed. Each scenario hits one
+# resource for --duration seconds from --concurrency threads and reports
+# p50/p95/p99 latency and requests per second. With --baseline the results
+# are compared against a stored run and regressions beyond --tolerance are
+# flagged (exit status 1).
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+USERS = 1000
+EVENTS = 10000
+PASSWORD = 'benchmark'
+
+def call(base_url, method, path, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method)
+    if data is not None:
+        request.add_header('Content-Type', 'application/json')
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+def login(base_url, email):
+    request = urllib.request.Request(
+        base_url + '/login',
+        data=json.dumps({'email': email, 'password': PASSWORD}).encode(),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())['access_token']
+
+# Each scenario returns (method, path, body, token) for one request
+def scenarios(users, events, user_token, admin_token):
+    return {
+        'home': lambda rng: ('GET', '/', None, None),
+        'users_get': lambda rng: ('GET', '/users', {'email': f'user{rng.randrange(users)}@example.com', 'password': PASSWORD}, None),
+        'users_post': lambda rng: ('POST', '/users', {'email': f'{uuid.uuid4().hex}@example.com', 'username': uuid.uuid4().hex, 'password': PASSWORD}, None),
+        'login': lambda rng: ('POST', '/login', {'email': f'user{rng.randrange(users)}@example.com', 'password': PASSWORD}, None),
+        'events_list': lambda rng: ('GET', '/events?limit=50', None, None),
+        'events_filtered': lambda rng: ('GET', '/events?limit=50&location=Nairobi&available=true', None, None),
+        'event_detail': lambda rng: ('GET', f'/events/{rng.randrange(1, events + 1)}', None, None),
+        'user_events': lambda rng: ('GET', f'/users/{rng.randrange(1, users + 1)}/events', None, None),
+        'user_events_all': lambda rng: ('GET', '/user_events', None, None),
+        'tickets_all': lambda rng: ('GET', '/tickets', None, None),
+        'tickets_post': lambda rng: ('POST', '/tickets', {'event_id': rng.randrange(1, events + 1), 'phone_number': '0700000000'}, user_token),
+        'admin_stats': lambda rng: ('GET', '/admin/stats', None, admin_token),
+    }
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def run_scenario(base_url, build, concurrency, duration, seed):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            method, path, body, token = build(rng)
+            start = time.perf_counter()
+            status = call(base_url, method, path, body, token)
+            local.append(time.perf_counter() - start)
+            if status >= 500:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+# Compare against a baseline; returns the names of regressed scenarios
+def compare(results, baseline, tolerance):
+    regressed = []
+    print(f'\n{"scenario":<18}{"rps":>10}{"base":>10}{"diff":>9}{"p95":>10}{"base":>10}{"diff":>9}')
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        rps_diff = (result['rps'] - base['rps']) / base['rps'] if base['rps'] else 0.0
+        p95_diff = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0.0
+        flag = ''
+        if rps_diff < -tolerance or p95_diff > tolerance:
+            regressed.append(name)
+            flag = '  REGRESSED'
+        print(f'{name:<18}{result["rps"]:>10}{base["rps"]:>10}{rps_diff:>+9.0%}'
+              f'{result["p95_ms"]:>10}{base["p95_ms"]:>10}{p95_diff:>+9.0%}{flag}')
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--scenarios', help='Comma-separated subset to run.')
+    parser.add_argument('--users', type=int, default=USERS, help='Users seeded on the target.')
+    parser.add_argument('--events', type=int, default=EVENTS, help='Events seeded on the target.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', help='Free-form description of the target stored with the results.')
+    parser.add_argument('--output', help='Write results as JSON.')
+    parser.add_argument('--baseline', help='Compare against a stored results file.')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed fractional regression.')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    user_token = login(base_url, 'user0@example.com')
+    admin_token = login(base_url, 'admin0@admin.com')
+    available = scenarios(args.users, args.events, user_token, admin_token)
+    selected = args.scenarios.split(',') if args.scenarios else list(available)
+
+    results = {}
+    print(f'{"scenario":<18}{"requests":>10}{"errors":>8}{"rps":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+    for name in selected:
+        result = results[name] = run_scenario(base_url, available[name], args.concurrency, args.duration, args.seed)
+        print(f'{name:<18}{result["requests"]:>10}{result["errors"]:>8}{result["rps"]:>10}'
+              f'{result["p50_ms"]:>10}{result["p95_ms"]:>10}{result["p99_ms"]:>10}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            config = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}
+            json.dump({'config': config, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Seed a database with benchmark data.
+#
+#   cd server && DATABASE_URL=... python -m benchmarks.seed --users 1000 --events 10000 --tickets 100000
+#
+# Every user's password is 'benchmark'; admin0@admin.com .. are admins.
+# Rows are written with executemany in chunks; existing data is dropped first
+# unless --append is given.
+import argparse
+import random
+from datetime import datetime, timedelta
+from app import create_app
+from models import db, User, Event, Ticket, UserEvent
+from hashing import hash_password
+from stats import rebuild_event_stats
+
+PASSWORD = 'benchmark'
+CHUNK = 5000
+
+def insert_chunked(table, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(table.insert(), rows[start:start + CHUNK])
+    db.session.commit()
+
+def seed(users, admins, events, tickets, registrations, seed):
+    rng = random.Random(seed)
+    password_hash = hash_password(PASSWORD)
+    locations = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Malindi', 'Naivasha']
+
+    insert_chunked(User.__table__, [
+        {'email': f'admin{i}@admin.com', 'username': f'admin{i}', 'password_hash': password_hash, 'is_admin': True, 'is_active': True}
+        for i in range(admins)
+    ] + [
+        {'email': f'user{i}@example.com', 'username': f'user{i}', 'password_hash': password_hash, 'is_admin': False, 'is_active': True}
+        for i in range(users)
+    ])
+    user_ids = list(db.session.scalars(db.select(User.id)))
+
+    start = datetime.utcnow()
+    insert_chunked(Event.__table__, [
+        {
+            'image': f'https://example.com/events/{i}.jpg',
+            'name': f'Event {i}',
+            'datetime': start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            'location': rng.choice(locations),
+            'capacity': 1_000_000,
+            'description': f'Benchmark event {i} ' + 'lorem ipsum dolor sit amet ' * rng.randint(1, 8),
+            'number_of_tickets': 1_000_000,
+        }
+        for i in range(events)
+    ])
+    event_ids = list(db.session.scalars(db.select(Event.id)))
+
+    insert_chunked(Ticket.__table__, [
+        {
+            'ticket_number': f'seed-{i}',
+            'price': float(rng.choice((500, 1000, 2500))),
+            'event_id': rng.choice(event_ids),
+            'user_id': rng.choice(user_ids),
+            'phone_number': '0700000000',
+        }
+        for i in range(tickets)
+    ])
+
+    pairs = set()
+    while len(pairs) < min(registrations, len(user_ids) * len(event_ids)):
+        pairs.add((rng.choice(user_ids), rng.choice(event_ids)))
+    insert_chunked(UserEvent.__table__, [{'user_id': u, 'event_id': e} for u, e in pairs])
+
+    rebuild_event_stats()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--admins', type=int, default=5)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--tickets', type=int, default=50000)
+    parser.add_argument('--registrations', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--append', action='store_true', help='Keep existing rows.')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if not args.append:
+            db.drop_all()
+        db.create_all()
+        seed(args.users, args.admins, args.events, args.tickets, args.registrations, args.seed)
+        print(f'Seeded {args.users + args.admins} users, {args.events} events, '
+              f'{args.tickets} tickets, {args.registrations} registrations')
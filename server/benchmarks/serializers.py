@@ -0,0 +1,67 @@
+# Compare SerializerMixin.to_dict against the precomputed serializers.
+#
+#   cd server && python -m benchmarks.serializers [rows ...]
+#
+# Runs against an in-memory SQLite database so only serialization cost differs.
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, Event
+from serializers import serializer_for, orjson
+
+def seed(count):
+    base = datetime(2026, 1, 1)
+    db.session.execute(Event.__table__.insert(), [
+        {
+            'image': f'https://example.com/{i}.jpg',
+            'name': f'Event {i}',
+            'datetime': base + timedelta(minutes=i),
+            'location': 'Nairobi',
+            'capacity': 500,
+            'description': 'Lorem ipsum dolor sit amet ' * 4,
+            'number_of_tickets': 250,
+        }
+        for i in range(count)
+    ])
+    db.session.commit()
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def run(count):
+    db.drop_all()
+    db.create_all()
+    seed(count)
+    serializer = serializer_for(Event)
+
+    def with_to_dict():
+        events = Event.query.all()
+        return [event.to_dict() for event in events]
+
+    def with_serializer():
+        return serializer.all(db.session.execute(serializer.select()))
+
+    db.session.expunge_all()
+    slow, expected = timed(with_to_dict)
+    db.session.expunge_all()
+    fast, actual = timed(with_serializer)
+    assert actual == expected
+
+    print(f'{count:>8} rows  to_dict {slow * 1000:9.1f} ms  compiled {fast * 1000:9.1f} ms  speedup {slow / fast:5.1f}x')
+    encode_std, _ = timed(lambda: json.dumps(actual))
+    if orjson is not None:
+        encode_orjson, _ = timed(lambda: orjson.dumps(actual))
+        print(f'{"":>8}       json    {encode_std * 1000:9.1f} ms  orjson   {encode_orjson * 1000:9.1f} ms')
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        for count in counts:
+            run(count)
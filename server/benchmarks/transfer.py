@@ -0,0 +1,74 @@
+# Ticket export and import throughput in rows/s.
+#
+#   cd server && DATABASE_URL=... python -m benchmarks.transfer --rows 1000000
+#
+# Imports --rows generated tickets as CSV and as NDJSON into an empty tickets
+# table, then exports them in both formats, all through the admin endpoints.
+# Drops and recreates the schema first, so point it at a scratch database.
+import argparse
+import json
+import time
+from flask_jwt_extended import create_access_token
+from app import create_app
+from auth import user_claims
+from models import db, User, Event, Ticket
+
+def csv_body(rows, offset):
+    yield b'ticket_number,price,event_id,user_id\n'
+    for i in range(offset, offset + rows):
+        yield f'bench-{i:010d},25.0,{1 + i % 100},1\n'.encode()
+
+def ndjson_body(rows, offset):
+    for i in range(offset, offset + rows):
+        yield json.dumps({'ticket_number': f'bench-{i:010d}', 'price': 25.0, 'event_id': 1 + i % 100, 'user_id': 1}).encode() + b'\n'
+
+def report(label, rows, seconds, size=None):
+    extra = f'  {size / seconds / 1e6:8.1f} MB/s' if size else ''
+    print(f'{label:<16}{rows:>10} rows  {seconds:8.2f} s  {rows / seconds:>10.0f} rows/s{extra}')
+
+def run(rows):
+    app = create_app({'RATE_LIMITS': '', 'SLOW_REQUEST_MS': 10 ** 9})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        admin = User(email='admin0@admin.com', username='admin0', password_hash='-', is_admin=True)
+        db.session.add(admin)
+        db.session.execute(Event.__table__.insert(), [
+            {'image': '-', 'name': f'Event {i}', 'location': 'Nairobi', 'capacity': rows, 'number_of_tickets': rows}
+            for i in range(100)
+        ])
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=str(admin.id), additional_claims=user_claims(admin))}
+
+    client = app.test_client()
+    half = rows // 2
+    for label, body, mimetype, count, offset in (
+        ('import csv', csv_body, 'text/csv', half, 0),
+        ('import ndjson', ndjson_body, 'application/x-ndjson', rows - half, half),
+    ):
+        data = b''.join(body(count, offset))
+        start = time.perf_counter()
+        response = client.post('/admin/import/tickets', data=data, content_type=mimetype, headers=headers)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.json
+        report(label, response.json['imported'], elapsed, len(data))
+
+    for format in ('csv', 'ndjson'):
+        start = time.perf_counter()
+        response = client.get(f'/admin/export/tickets?format={format}', headers=headers, buffered=False)
+        size = lines = 0
+        for chunk in response.response:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        response.close()
+        elapsed = time.perf_counter() - start
+        report(f'export {format}', lines - (1 if format == 'csv' else 0), elapsed, size)
+
+    with app.app_context():
+        assert db.session.query(Ticket).count() == rows
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,187 @@
+import json
+from datetime import datetime
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm.exc import StaleDataError
+from models import db, Event, EventOrganizer, EventStats, Order, SeatHold, SeatMap, Ticket, TicketArchive, UserEvent, UserEventArchive
+from pagination import parse_datetime
+
+# Batch create/update/delete for events. Items are validated up front and each
+# chunk of valid items is written with one executemany statement in its own
+# transaction. If a chunk's statement fails, its items are retried one by one
+# inside savepoints so only the offending items are reported as errors.
+#
+# Updates go through Event's version_id_col: an item may carry the "version"
+# it was read at, and is rejected as a conflict if the event changed since.
+# Items without one are applied to the current version.
+#
+# Deletes detach tickets and registrations (live and archived) and organizers
+# by clearing their event_id, as the ORM does for Events.delete, and remove
+# the event's seat map, holds and stats. Events with orders are refused, since
+# orders can't exist without their event.
+
+REQUIRED_EVENT_FIELDS = ('name', 'image', 'location', 'description', 'capacity', 'number_of_tickets')
+EVENT_FIELDS = REQUIRED_EVENT_FIELDS + ('datetime', 'latitude', 'longitude')
+
+# Parse a JSON array or NDJSON body into a list of items; lines that aren't
+# valid JSON become error placeholders so indexes still line up
+def parse_items(request):
+    if request.mimetype == 'application/x-ndjson':
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(ValueError('Invalid JSON'))
+        return items
+    data = request.get_json(silent=True)
+    return data if isinstance(data, list) else None
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def clean_event(item, partial):
+    if isinstance(item, ValueError):
+        return None, str(item)
+    if not isinstance(item, dict):
+        return None, 'Invalid item'
+    if not partial and not all(item.get(field) for field in REQUIRED_EVENT_FIELDS):
+        return None, 'Missing required fields'
+    values = {field: item[field] for field in EVENT_FIELDS if field in item}
+    if values.get('datetime') is not None:
+        values['datetime'] = parse_datetime(values['datetime'])
+        if values['datetime'] is None:
+            return None, 'Invalid datetime'
+    elif not partial:
+        values['datetime'] = datetime.utcnow()
+    return values, None
+
+def _write_chunk(chunk, execute_many, execute_one):
+    # chunk is a list of (index, values); returns {index: result or error}
+    try:
+        results = execute_many([values for _, values in chunk])
+        db.session.commit()
+        return dict(zip([index for index, _ in chunk], results))
+    except Exception:
+        db.session.rollback()
+
+    results = {}
+    for index, values in chunk:
+        try:
+            with db.session.begin_nested():
+                results[index] = execute_one(values)
+        except StaleDataError:
+            results[index] = {'error': 'Version conflict'}
+        except Exception as e:
+            results[index] = {'error': str(e)}
+    db.session.commit()
+    return results
+
+def _existing_ids(ids):
+    return set(db.session.scalars(select(Event.id).where(Event.id.in_(ids))))
+
+def create_events(items, chunk_size):
+    results = {}
+    valid = []
+    for index, item in enumerate(items):
+        values, error = clean_event(item, partial=False)
+        if error:
+            results[index] = {'error': error}
+        else:
+            valid.append((index, values))
+
+    def execute_many(rows):
+        ids = db.session.scalars(insert(Event).returning(Event.id, sort_by_parameter_order=True), rows).all()
+        return [{'id': id, 'status': 'created'} for id in ids]
+
+    def execute_one(values):
+        id = db.session.execute(insert(Event).values(**values).returning(Event.id)).scalar_one()
+        return {'id': id, 'status': 'created'}
+
+    for chunk in _chunks(valid, chunk_size):
+        results.update(_write_chunk(chunk, execute_many, execute_one))
+    return _ordered(results)
+
+def update_events(items, chunk_size):
+    results = {}
+    valid = []
+    for index, item in enumerate(items):
+        values, error = clean_event(item, partial=True)
+        if error is None and item.get('id') is None:
+            error = 'Missing event ID'
+        if error is None and not values:
+            error = 'No fields to update'
+        if error:
+            results[index] = {'error': error}
+        else:
+            valid.append((index, dict(values, id=item['id'], version=item.get('version'))))
+
+    def execute_many(rows):
+        db.session.execute(update(Event), rows)
+        return [{'id': row['id'], 'status': 'updated'} for row in rows]
+
+    def execute_one(values):
+        db.session.execute(update(Event), [values])
+        return {'id': values['id'], 'status': 'updated'}
+
+    for chunk in _chunks(valid, chunk_size):
+        versions = dict(db.session.execute(select(Event.id, Event.version).where(Event.id.in_([values['id'] for _, values in chunk]))).all())
+        for index, values in chunk:
+            if values['id'] not in versions:
+                results[index] = {'error': 'Event not found'}
+            elif values.get('version') is None:
+                values['version'] = versions[values['id']]
+        chunk = [(index, values) for index, values in chunk if values['id'] in versions]
+        if chunk:
+            results.update(_write_chunk(chunk, execute_many, execute_one))
+    return _ordered(results)
+
+def _delete(ids):
+    for model in (Ticket, UserEvent, EventOrganizer, TicketArchive, UserEventArchive):
+        db.session.execute(
+            update(model).where(model.event_id.in_(ids)).values(event_id=None)
+            .execution_options(synchronize_session=False)
+        )
+    for model in (SeatHold, SeatMap, EventStats):
+        db.session.execute(delete(model).where(model.event_id.in_(ids)))
+    db.session.execute(delete(Event).where(Event.id.in_(ids)))
+
+def delete_events(items, chunk_size):
+    results = {}
+    valid = []
+    for index, item in enumerate(items):
+        if isinstance(item, ValueError):
+            results[index] = {'error': str(item)}
+            continue
+        id = item.get('id') if isinstance(item, dict) else item
+        if not isinstance(id, int):
+            results[index] = {'error': 'Missing event ID'}
+        else:
+            valid.append((index, id))
+
+    def execute_many(ids):
+        _delete(ids)
+        return [{'id': id, 'status': 'deleted'} for id in ids]
+
+    def execute_one(id):
+        _delete([id])
+        return {'id': id, 'status': 'deleted'}
+
+    for chunk in _chunks(valid, chunk_size):
+        ids = [id for _, id in chunk]
+        existing = _existing_ids(ids)
+        ordered = set(db.session.scalars(select(Order.event_id).where(Order.event_id.in_(ids)).distinct()))
+        for index, id in chunk:
+            if id not in existing:
+                results[index] = {'error': 'Event not found'}
+            elif id in ordered:
+                results[index] = {'error': 'Event has orders'}
+        chunk = [(index, id) for index, id in chunk if id in existing and id not in ordered]
+        if chunk:
+            results.update(_write_chunk(chunk, execute_many, execute_one))
+    return _ordered(results)
+
+def _ordered(results):
+    return [dict(index=index, **results[index]) for index in sorted(results)]
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from flask import Response, request
+from werkzeug.http import http_date
+from redis_client import redis_for
+
+# Read-through cache for event reads.
+#
+# Entries hold the serialized payload, any extra headers and an ETag computed
+# once when the entry is filled, so hits skip the database and serialization,
+# and If-None-Match hits skip the body entirely.
+#
+# List pages are keyed by a generation counter that every event write bumps,
+# which drops all pages at once without having to enumerate them. Single
+# events are deleted by id.
+#
+# List ETags come from the cache key, i.e. the generation counter and the
+# page's arguments, so no body is hashed. In-process counters only see this
+# worker's writes and restart at zero, so there the tag is also scoped to the
+# process: another worker's or a restarted one's pages never match it.
+# Last-Modified is the fill time, which is never earlier than the last write
+# the entry reflects.
+#
+# Config (read from the app by init_cache):
+#   CACHE_URL          redis:// URL, overriding REDIS_URL (see redis_client.py);
+#                      with neither set, the in-process LRU
+#   CACHE_MAX_ENTRIES  in-process LRU size
+#   CACHE_TTL          seconds an entry stays fresh
+#   HTTP_CACHE_MAX_AGE Cache-Control max-age for browsers and CDNs
+
+class LRUCache:
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._scope_pid = self._scope = None
+        self.hits = self.misses = self.evictions = 0
+
+    # Renewed in each forked worker, since the cache is created before the fork
+    @property
+    def etag_scope(self):
+        if self._scope_pid != os.getpid():
+            self._scope_pid, self._scope = os.getpid(), os.urandom(8).hex()
+        return self._scope
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+# Same interface backed by a Redis-compatible server, shared across workers
+class RedisCache:
+    etag_scope = ''
+
+    def __init__(self, client, ttl=30, prefix='epic:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def counter(self, name):
+        return int(self.client.get(self.prefix + 'counter:' + name) or 0)
+
+    def incr(self, name):
+        return self.client.incr(self.prefix + 'counter:' + name)
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.client.info('stats').get('evicted_keys', 0),
+        }
+
+cache = LRUCache()
+max_age = 0
+
+def init_cache(app):
+    global cache, max_age
+    max_age = app.config.get('HTTP_CACHE_MAX_AGE', 0)
+    ttl = app.config.get('CACHE_TTL', 30)
+    client = redis_for(app, 'CACHE_URL')
+    if client is not None:
+        cache = RedisCache(client, ttl=ttl)
+    else:
+        cache = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl=ttl)
+
+def cache_stats():
+    return cache.stats()
+
+# Bumped only when an event's searchable content may have changed (create,
+# edit, delete), not on ticket sales
+def event_content_generation():
+    return cache.counter('event_content')
+
+def event_list_key():
+    args = urlencode(sorted(request.args.items(multi=True)))
+    return f'events:list:{cache.counter("events")}:{args}'
+
+def event_key(event_id):
+    return f'events:{event_id}'
+
+# A single event's ETag is built from its edit version and ticket count, the
+# only ways its row changes, so Events.patch can check If-Match in the UPDATE
+# itself without reading the row first
+def event_etag(event):
+    return f"{event['id']}.{event['version']}.{event['number_of_tickets']}"
+
+# Parse an event_etag back into (version, number_of_tickets), or None when the
+# tag isn't one of this event's
+def parse_event_etag(event_id, etag):
+    try:
+        id, version, number_of_tickets = (int(part) for part in etag.split('.'))
+    except ValueError:
+        return None
+    return (version, number_of_tickets) if id == event_id else None
+
+# Return the cached entry for key, filling it with compute() on a miss.
+# compute returns (data, headers); a data of None means "not found" and is
+# not cached, so a later create is visible immediately. etag computes the
+# entry's ETag from data; by default it's derived from the key (which carries
+# the generation) and the cache's etag_scope.
+def cached(key, compute, etag=None):
+    entry = cache.get(key)
+    if entry is None:
+        data, headers = compute()
+        if data is None:
+            tag = None
+        elif etag is not None:
+            tag = etag(data)
+        else:
+            tag = hashlib.blake2b(f'{cache.etag_scope}:{key}'.encode(), digest_size=16).hexdigest()
+        entry = {'data': data, 'headers': headers, 'etag': tag, 'modified': int(time.time())}
+        if data is not None:
+            cache.set(key, entry)
+    return entry
+
+# Turn a cache entry into a Flask-RESTful return value, or a 304 when the
+# client already holds this version. If-None-Match compares weakly, so tags
+# weakened by compression still match; If-Modified-Since is only consulted
+# without it.
+def respond(entry):
+    headers = dict(
+        entry['headers'],
+        ETag=f'"{entry["etag"]}"',
+        **{'Last-Modified': http_date(entry['modified']), 'Cache-Control': f'public, max-age={max_age}'}
+    )
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(entry['etag'])
+    else:
+        since = request.if_modified_since
+        not_modified = since is not None and since.timestamp() >= entry['modified']
+    if not_modified:
+        return Response(status=304, headers=headers)
+    return entry['data'], 200, headers
+
+# Call after any write that changes an event's row; event_id=None only drops
+# list pages (e.g. a new event). content=True for writes other than inventory
+# changes, so the search index is rebuilt too.
+def invalidate_event(event_id=None, content=False):
+    invalidate_events([] if event_id is None else [event_id], content)
+
+def invalidate_events(event_ids, content=False):
+    cache.incr('events')
+    if content:
+        cache.incr('event_content')
+    for event_id in event_ids:
+        cache.delete(event_key(event_id))
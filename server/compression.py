@@ -0,0 +1,85 @@
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Negotiated response compression. Bodies of compressible types are encoded
+# with brotli or gzip, whichever the client prefers and is available, once
+# they reach COMPRESS_MIN_SIZE; smaller bodies cost more to compress than they
+# save on the wire. Streamed responses (NDJSON exports) are compressed chunk
+# by chunk as they are generated.
+#
+# A compressed body is a different representation, so its ETag is weakened;
+# conditional requests compare weakly and still match it.
+#
+# Config (read from the app by init_compression):
+#   COMPRESS_MIN_SIZE  smallest body in bytes worth compressing
+#   COMPRESS_LEVEL     gzip level (1-9)
+#   COMPRESS_BR_QUALITY  brotli quality (0-11)
+
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+def _compressor(encoding, settings):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings['br_quality'])
+        return compressor.process, compressor.finish
+    # wbits 31 selects the gzip container
+    compressor = zlib.compressobj(settings['level'], zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+def _compress_stream(chunks, encoding, settings):
+    compress, finish = _compressor(encoding, settings)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def init_compression(app):
+    settings = {
+        'min_size': app.config.get('COMPRESS_MIN_SIZE', 1024),
+        'level': app.config.get('COMPRESS_LEVEL', 6),
+        'br_quality': app.config.get('COMPRESS_BR_QUALITY', 4),
+    }
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.mimetype not in COMPRESSIBLE_TYPES
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or request.method == 'HEAD'
+        ):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, settings)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < settings['min_size']:
+                return response
+            compress, finish = _compressor(encoding, settings)
+            response.set_data(compress(body) + finish())
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
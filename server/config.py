@@ -0,0 +1,85 @@
+import os
+
+def _bool(name, default):
+    return os.getenv(name, default).lower() == 'true'
+
+# Application settings read from the environment (and the .env file loaded by
+# app.py). create_app applies these first, then any overrides it is given.
+def config_from_env():
+    config = {
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'DB_POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 5)),
+        'DB_MAX_OVERFLOW': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'DB_POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'DB_POOL_RECYCLE': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'DB_POOL_PRE_PING': _bool('DB_POOL_PRE_PING', 'true'),
+        'DB_STATEMENT_TIMEOUT_MS': int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0)),
+        'DB_PGBOUNCER': _bool('DB_PGBOUNCER', 'false'),
+        'DATABASE_REPLICA_URLS': os.getenv('DATABASE_REPLICA_URLS', ''),
+        'REPLICA_SELECTION': os.getenv('REPLICA_SELECTION', 'round_robin'),
+        'REPLICA_MAX_LAG_SECONDS': float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5)),
+        'REPLICA_CHECK_SECONDS': float(os.getenv('REPLICA_CHECK_SECONDS', 5)),
+        'REPLICA_RETRY_SECONDS': float(os.getenv('REPLICA_RETRY_SECONDS', 30)),
+        'REPLICA_STICKY_SECONDS': float(os.getenv('REPLICA_STICKY_SECONDS', 10)),
+        'REPLICA_STICKY_URL': os.getenv('REPLICA_STICKY_URL'),
+        'SECRET_KEY': os.getenv('SECRET_KEY'),
+        'JWT_SECRET_KEY': os.getenv('SECRET_KEY'),
+        'REVOCATION_REFRESH_SECONDS': int(os.getenv('REVOCATION_REFRESH_SECONDS', 30)),
+        'EVENTS_PAGE_SIZE': int(os.getenv('EVENTS_PAGE_SIZE', 50)),
+        'EVENTS_MAX_PAGE_SIZE': int(os.getenv('EVENTS_MAX_PAGE_SIZE', 200)),
+        'BULK_CHUNK_SIZE': int(os.getenv('BULK_CHUNK_SIZE', 500)),
+        'BULK_MAX_ITEMS': int(os.getenv('BULK_MAX_ITEMS', 10000)),
+        'IMPORT_CHUNK_ROWS': int(os.getenv('IMPORT_CHUNK_ROWS', 5000)),
+        'SEARCH_MAX_RESULTS': int(os.getenv('SEARCH_MAX_RESULTS', 50)),
+        'SEARCH_INDEX_MAX_AGE': float(os.getenv('SEARCH_INDEX_MAX_AGE', 30)),
+        'QUEUED_PURCHASES': _bool('QUEUED_PURCHASES', 'false'),
+        'ORDER_BATCH_SIZE': int(os.getenv('ORDER_BATCH_SIZE', 100)),
+        'ORDER_POLL_INTERVAL': float(os.getenv('ORDER_POLL_INTERVAL', 0.5)),
+        'ORDER_MAX_WAIT': float(os.getenv('ORDER_MAX_WAIT', 30)),
+        'ORDER_WORKER_THREAD': _bool('ORDER_WORKER_THREAD', 'false'),
+        'AVAILABILITY_URL': os.getenv('AVAILABILITY_URL'),
+        'AVAILABILITY_MAX_RATE': float(os.getenv('AVAILABILITY_MAX_RATE', 2)),
+        'AVAILABILITY_POLL_SECONDS': float(os.getenv('AVAILABILITY_POLL_SECONDS', 5)),
+        'AVAILABILITY_STREAM_SECONDS': float(os.getenv('AVAILABILITY_STREAM_SECONDS', 300)),
+        'AVAILABILITY_MAX_STREAMS': int(os.getenv('AVAILABILITY_MAX_STREAMS', 100)),
+        'ARCHIVE_AFTER_DAYS': int(os.getenv('ARCHIVE_AFTER_DAYS', 7)),
+        'ARCHIVE_BATCH_SIZE': int(os.getenv('ARCHIVE_BATCH_SIZE', 100)),
+        'SEAT_HOLD_SECONDS': int(os.getenv('SEAT_HOLD_SECONDS', 600)),
+        'SEAT_HOLD_MAX_SEATS': int(os.getenv('SEAT_HOLD_MAX_SEATS', 10)),
+        'SEAT_MAP_MAX_SEATS': int(os.getenv('SEAT_MAP_MAX_SEATS', 100000)),
+        'SEAT_SWEEP_INTERVAL': float(os.getenv('SEAT_SWEEP_INTERVAL', 15)),
+        # Default Redis server for the cache, rate limits, availability fan-out
+        # and replica stickiness; their own *_URL settings override it
+        'REDIS_URL': os.getenv('REDIS_URL'),
+        'CACHE_URL': os.getenv('CACHE_URL'),
+        'CACHE_MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 1024)),
+        'CACHE_TTL': int(os.getenv('CACHE_TTL', 30)),
+        'HTTP_CACHE_MAX_AGE': int(os.getenv('HTTP_CACHE_MAX_AGE', 5)),
+        'COMPRESS_MIN_SIZE': int(os.getenv('COMPRESS_MIN_SIZE', 1024)),
+        'COMPRESS_LEVEL': int(os.getenv('COMPRESS_LEVEL', 6)),
+        'COMPRESS_BR_QUALITY': int(os.getenv('COMPRESS_BR_QUALITY', 4)),
+        'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', 500)),
+        'SLOW_REQUEST_MAX_STATEMENTS': int(os.getenv('SLOW_REQUEST_MAX_STATEMENTS', 20)),
+        'LOG_FILE': os.getenv('LOG_FILE', 'app.log'),
+        'LOG_MAX_BYTES': int(os.getenv('LOG_MAX_BYTES', 10_000_000)),
+        'LOG_BACKUP_COUNT': int(os.getenv('LOG_BACKUP_COUNT', 5)),
+        'PASSWORD_HASH_METHOD': os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+        # Per server worker; see hashing.py for sizing
+        'HASH_WORKERS': int(os.getenv('HASH_WORKERS', 1)),
+        'HASH_TIMEOUT': float(os.getenv('HASH_TIMEOUT', 10)),
+    }
+    config['HASH_QUEUE_SIZE'] = int(os.getenv('HASH_QUEUE_SIZE', config['HASH_WORKERS'] * 4))
+    config.update({
+        'RATE_LIMITS': os.getenv('RATE_LIMITS', 'login:post=10/60,users:post=10/60'),
+        'RATE_LIMIT_DEFAULT': os.getenv('RATE_LIMIT_DEFAULT'),
+        'RATE_LIMIT_URL': os.getenv('RATE_LIMIT_URL'),
+        'RATE_LIMIT_MAX_KEYS': int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000)),
+        # Reverse proxies in front of the app whose X-Forwarded-* headers are
+        # trusted; 0 uses the socket address, which behind a proxy is the proxy's
+        'PROXY_HOPS': int(os.getenv('PROXY_HOPS', 0)),
+        # Leave room so admitted requests never wait on the connection pool
+        'MAX_CONCURRENT_REQUESTS': int(os.getenv('MAX_CONCURRENT_REQUESTS', config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW'])),
+        'ADMISSION_TIMEOUT': float(os.getenv('ADMISSION_TIMEOUT', 0.1)),
+    })
+    return config
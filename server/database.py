@@ -0,0 +1,123 @@
+import threading
+import time
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+# Engine/pool configuration and pool metrics.
+#
+# Config (read from the app by engine_options):
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+#   DB_POOL_PRE_PING    QueuePool settings
+#   DB_STATEMENT_TIMEOUT_MS   Postgres statement_timeout, 0 disables
+#   DB_PGBOUNCER        PgBouncer transaction pooling: keep no local pool
+#                       and set the timeout per transaction, since PgBouncer
+#                       rejects startup options and shares sessions
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+pool_metrics = PoolMetrics()
+
+# QueuePool that records how long each checkout waited for a connection
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+def engine_options(uri, config):
+    if not uri or uri.startswith('sqlite'):
+        return {}
+
+    options = {}
+    connect_args = {}
+    timeout = config.get('DB_STATEMENT_TIMEOUT_MS', 0)
+    if config.get('DB_PGBOUNCER'):
+        options['poolclass'] = NullPool
+    else:
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=config.get('DB_POOL_SIZE', 5),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+            pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+            pool_pre_ping=config.get('DB_POOL_PRE_PING', True),
+        )
+        if timeout and uri.startswith('postgres'):
+            connect_args['options'] = f'-c statement_timeout={int(timeout)}'
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+def install_pool_metrics(engine, config):
+    event.listen(engine, 'checkout', lambda *args: pool_metrics.incr('checkouts'))
+    event.listen(engine, 'connect', lambda *args: pool_metrics.incr('connects'))
+    event.listen(engine, 'invalidate', lambda *args: pool_metrics.incr('invalidations'))
+
+    timeout = config.get('DB_STATEMENT_TIMEOUT_MS', 0)
+    if config.get('DB_PGBOUNCER') and timeout and engine.dialect.name == 'postgresql':
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {
+        'pool': type(pool).__name__,
+        'checkouts': pool_metrics.checkouts,
+        'connects': pool_metrics.connects,
+        'invalidations': pool_metrics.invalidations,
+    }
+    if isinstance(pool, QueuePool):
+        waits = pool_metrics.waits
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            waits=waits,
+            timeouts=pool_metrics.timeouts,
+            wait_seconds_total=round(pool_metrics.wait_seconds, 6),
+            wait_seconds_avg=round(pool_metrics.wait_seconds / waits, 6) if waits else 0.0,
+            wait_seconds_max=round(pool_metrics.max_wait_seconds, 6),
+        )
+    return stats
+
+# db.session class. Requests that replicas.py has routed to a read replica
+# (g.read_engine) run their queries there; flushes, explicit binds and
+# anything outside a request use the usual bind.
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context():
+            engine = g.get('read_engine')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,57 @@
+# Production serving profile: gunicorn -c gunicorn.conf.py
+#
+# Worker models (GUNICORN_WORKER_CLASS):
+#   sync     one request per process; simplest, good for CPU-bound handlers
+#   gthread  GUNICORN_THREADS requests per process; the default, since most
+#            request time is spent waiting on the database
+#   gevent   many cooperative requests per process; needs gevent and
+#            psycogreen installed, and runs without preload so the monkey
+#            patching happens before the app is imported
+#
+# The app is preloaded in the master (except under gevent) so workers fork
+# with the code already imported. Pooled database connections must not be
+# shared across the fork, so each worker discards the inherited pools (the
+# primary's and any read replicas') in post_fork and opens its own connections.
+#
+# Graceful reload: `kill -HUP <master pid>` starts new workers and lets the
+# old ones finish their requests within graceful_timeout. With preload_app
+# the code itself is only reloaded by a full restart or USR2 upgrade.
+import multiprocessing
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+preload_app = worker_class != 'gevent'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning('psycogreen is not installed; psycopg2 calls will block the gevent loop')
+        return
+
+    from models import db
+    from replicas import replica_engines
+    app = worker.app.wsgi()
+    with app.app_context():
+        for engine in [*db.engines.values(), *replica_engines()]:
+            # close=False leaves the parent's connections alone and just
+            # drops this process's references to them
+            engine.dispose(close=False)
@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing runs in a bounded process pool so scrypt/pbkdf2 work doesn't
+# pin request threads. When HASH_QUEUE_SIZE hashes are already in flight new
+# ones are refused with HashingBusy, which endpoints turn into a 503. A hash
+# keeps its slot until it finishes, even after the request stopped waiting
+# for it, so timed-out work can't pile up behind the limit.
+#
+# Every gunicorn worker has its own pool, so the server runs GUNICORN_WORKERS
+# x HASH_WORKERS hashing processes. The default of one per worker already
+# gives about two per core under the default gunicorn profile; raise it only
+# when running fewer workers.
+#
+# Config (read from the app by init_hashing):
+#   PASSWORD_HASH_METHOD  Werkzeug method string, e.g. 'scrypt:32768:8:1' or
+#                         'pbkdf2:sha256:600000'
+#   HASH_WORKERS          pool processes per server worker; 0 hashes inline
+#                         on the request thread
+#   HASH_QUEUE_SIZE       max hashes queued or running at once
+#   HASH_TIMEOUT          seconds to wait for a result
+
+class HashingBusy(Exception):
+    pass
+
+_settings = {
+    'method': 'scrypt',
+    'workers': 0,
+    'queue_size': 0,
+    'timeout': 10,
+}
+_current_prefix = None
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+def init_hashing(app):
+    global _current_prefix, _executor, _slots
+    workers = app.config.get('HASH_WORKERS', 1)
+    _settings.update(
+        method=app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        workers=workers,
+        queue_size=app.config.get('HASH_QUEUE_SIZE', workers * 4),
+        timeout=app.config.get('HASH_TIMEOUT', 10),
+    )
+    # Werkzeug expands defaults ('scrypt' -> 'scrypt:32768:8:1'), so compare
+    # stored hashes against the prefix it actually writes
+    _current_prefix = generate_password_hash('', _settings['method']).split('$', 1)[0]
+    _executor = None
+    _slots = threading.BoundedSemaphore(max(_settings['queue_size'], 1))
+
+# The pool is created lazily so each forked server worker gets its own
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=_settings['workers'])
+    return _executor
+
+def _run(fn, *args):
+    if not _settings['workers']:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda future: _slots.release())
+    try:
+        return future.result(timeout=_settings['timeout'])
+    except FutureTimeoutError:
+        raise HashingBusy()
+
+def hash_password(password):
+    return _run(generate_password_hash, password, _settings['method'])
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+# True when the stored hash was made with different parameters than the
+# configured ones, so it should be replaced after a successful login
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != _current_prefix
@@ -0,0 +1,36 @@
+from sqlalchemy import exists, select, update
+from models import db, Event, SeatMap
+
+# Atomically take tickets off an event's inventory with a single guarded UPDATE.
+# Concurrent buyers never read-modify-write the counter in Python, so the
+# database row can't be oversold. Returns the remaining count, or None when the
+# event is sold out or doesn't exist. The decrement joins the caller's
+# transaction and is rolled back with it.
+#
+# Events with a seat map only sell through seat holds (seated=True); general
+# admission purchases are refused by the same statement.
+def reserve_tickets(event_id, quantity=1, seated=False):
+    conditions = [
+        Event.id == event_id,
+        Event.capacity > 0,
+        Event.number_of_tickets >= quantity,
+        Event.archived_at.is_(None),
+    ]
+    if not seated:
+        conditions.append(~exists().where(SeatMap.event_id == Event.id))
+    stmt = (
+        update(Event)
+        .where(*conditions)
+        .values(number_of_tickets=Event.number_of_tickets - quantity)
+        .returning(Event.number_of_tickets)
+        .execution_options(synchronize_session=False)
+    )
+    return db.session.execute(stmt).scalar_one_or_none()
+
+# Only used on the failure path to tell "sold out" apart from "no such event"
+def event_exists(event_id):
+    return db.session.execute(select(Event.id).where(Event.id == event_id)).first() is not None
+
+# Also failure-path only: a general admission purchase hit a seated event
+def has_seat_map(event_id):
+    return db.session.execute(select(SeatMap.event_id).where(SeatMap.event_id == event_id)).first() is not None
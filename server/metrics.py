@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import defaultdict
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request latency and SQL instrumentation, exported in Prometheus text
+# format at /metrics. Counters live in the worker process; scrape each worker
+# or run one per instance.
+#
+# init_metrics runs before the other extensions so its before_request hook
+# starts the clock ahead of authentication. Streamed responses are recorded
+# when the server closes them, so their time and SQL include the body.
+# Server-sent event streams stay open for as long as the client listens, so
+# they're counted but kept out of the latency histogram and the slow log.
+#
+# Config (read from the app by init_metrics):
+#   SLOW_REQUEST_MS          log requests slower than this with their SQL
+#   SLOW_REQUEST_MAX_STATEMENTS   statements kept per request for that log
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(Histogram)
+        self.requests = defaultdict(int)
+        self.sql_statements = defaultdict(int)
+        self.sql_seconds = defaultdict(float)
+        self.serialization_seconds = defaultdict(float)
+
+    # seconds is None for requests kept out of the latency histogram
+    def record(self, endpoint, method, status, seconds, sql_count, sql_seconds, serialization_seconds):
+        key = (endpoint, method)
+        with self._lock:
+            if seconds is not None:
+                self.latency[key].observe(seconds)
+            self.requests[key + (status,)] += 1
+            self.sql_statements[key] += sql_count
+            self.sql_seconds[key] += sql_seconds
+            self.serialization_seconds[key] += serialization_seconds
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines.append('# HELP http_request_duration_seconds Request latency by endpoint.')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for (endpoint, method), histogram in sorted(self.latency.items()):
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {histogram.count}')
+
+            lines.append('# HELP http_requests_total Requests by endpoint and status.')
+            lines.append('# TYPE http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            for name, help, values in (
+                ('sql_statements_total', 'SQL statements executed while serving requests.', self.sql_statements),
+                ('sql_duration_seconds_total', 'Time spent executing SQL while serving requests.', self.sql_seconds),
+                ('serialization_duration_seconds_total', 'Time spent serializing rows while serving requests.', self.serialization_seconds),
+            ):
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} counter')
+                for (endpoint, method), value in sorted(values.items()):
+                    lines.append(f'{name}{{endpoint="{endpoint}",method="{method}"}} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+# Called by the serializers so serialization shows up separately from SQL
+def add_serialization_time(seconds):
+    if has_request_context() and 'metrics' in g:
+        g.metrics['serialization_seconds'] += seconds
+
+# A connection runs one statement at a time, so one start time per connection
+# is enough. A failed statement's is discarded, so it can't be mistaken for the
+# start of the connection's next one.
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    if context.connection is not None:
+        context.connection.info.pop('query_start', None)
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop('query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context() and 'metrics' in g:
+        metrics = g.metrics
+        metrics['sql_count'] += 1
+        metrics['sql_seconds'] += elapsed
+        if len(metrics['statements']) < metrics['max_statements']:
+            metrics['statements'].append((elapsed, statement))
+
+def init_metrics(app):
+    slow_seconds = app.config.get('SLOW_REQUEST_MS', 500) / 1000
+    max_statements = app.config.get('SLOW_REQUEST_MAX_STATEMENTS', 20)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics = {
+            'start': time.perf_counter(),
+            'sql_count': 0,
+            'sql_seconds': 0.0,
+            'serialization_seconds': 0.0,
+            'statements': [],
+            'max_statements': max_statements,
+        }
+
+    def finish(metrics, method, path, endpoint, status, timed):
+        elapsed = time.perf_counter() - metrics['start']
+        registry.record(endpoint, method, status, elapsed if timed else None,
+                        metrics['sql_count'], metrics['sql_seconds'], metrics['serialization_seconds'])
+        if timed and elapsed >= slow_seconds:
+            statements = ''.join(f'\n  {seconds * 1000:.1f} ms: {statement}' for seconds, statement in metrics['statements'])
+            app.logger.warning(
+                'Slow request %s %s: %.1f ms, %d SQL statements (%.1f ms), serialization %.1f ms%s',
+                method, path, elapsed * 1000, metrics['sql_count'],
+                metrics['sql_seconds'] * 1000, metrics['serialization_seconds'] * 1000, statements
+            )
+
+    @app.after_request
+    def record_request_metrics(response):
+        metrics = g.get('metrics')
+        if metrics is None or request.endpoint == 'metrics':
+            return response
+        args = (metrics, request.method, request.full_path, request.endpoint or 'unmatched', response.status_code,
+                response.mimetype != 'text/event-stream')
+        if response.is_streamed:
+            # The body (and its SQL) is produced after this hook; g.metrics
+            # stays in place so the stream's queries are counted, and the
+            # request is recorded once the server closes the response
+            response.call_on_close(lambda: finish(*args))
+        else:
+            del g.metrics
+            finish(*args)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,45 @@
+"""event search
+
+Revision ID: 07f2954b9272
+Revises: c2fce85ffacb
+Create Date: 2026-10-17 14:20:47.119583
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '07f2954b9272'
+down_revision = 'c2fce85ffacb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.create_index('ix_events_latitude_longitude', ['latitude', 'longitude'], unique=False)
+
+    # Full-text search column; other databases use the in-process index
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "ALTER TABLE events ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(location, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+            ") STORED"
+        )
+        op.execute('CREATE INDEX ix_events_search_vector ON events USING gin (search_vector)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX ix_events_search_vector')
+        op.execute('ALTER TABLE events DROP COLUMN search_vector')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_latitude_longitude')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
@@ -0,0 +1,59 @@
+"""seat maps
+
+Revision ID: 2cd92028dad7
+Revises: 68d9b384fd32
+Create Date: 2026-10-17 17:24:05.918342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2cd92028dad7'
+down_revision = '68d9b384fd32'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('seat_maps',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('seats_per_row', sa.Integer(), nullable=False),
+    sa.Column('sold', sa.LargeBinary(), nullable=False),
+    sa.Column('held', sa.LargeBinary(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_table('seat_holds',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('seats', sa.JSON(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('seat_holds', schema=None) as batch_op:
+        batch_op.create_index('ix_seat_holds_expires_at', ['expires_at'], unique=False)
+        batch_op.create_index('ix_seat_holds_event_id_expires_at', ['event_id', 'expires_at'], unique=False)
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seat', sa.Integer(), nullable=True))
+        batch_op.create_unique_constraint('uq_tickets_event_id_seat', ['event_id', 'seat'])
+
+
+def downgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_tickets_event_id_seat', type_='unique')
+        batch_op.drop_column('seat')
+
+    with op.batch_alter_table('seat_holds', schema=None) as batch_op:
+        batch_op.drop_index('ix_seat_holds_event_id_expires_at')
+        batch_op.drop_index('ix_seat_holds_expires_at')
+
+    op.drop_table('seat_holds')
+    op.drop_table('seat_maps')
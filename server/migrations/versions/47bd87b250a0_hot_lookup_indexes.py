@@ -0,0 +1,52 @@
+"""hot lookup indexes
+
+Revision ID: 47bd87b250a0
+Revises: 52de62150aa0
+Create Date: 2026-10-17 11:26:09.318845
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '47bd87b250a0'
+down_revision = '52de62150aa0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tickets_event_id'), ['event_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tickets_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('event_organizers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_event_organizers_event_id'), ['event_id'], unique=False)
+
+    # Keep the oldest registration when a user was registered twice, so the
+    # unique constraint can be created
+    op.execute(
+        'DELETE FROM user_events WHERE id NOT IN '
+        '(SELECT MIN(id) FROM user_events GROUP BY user_id, event_id)'
+    )
+    with op.batch_alter_table('user_events', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_user_events_user_id_event_id', ['user_id', 'event_id'])
+        batch_op.create_index(batch_op.f('ix_user_events_event_id'), ['event_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_events', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_events_event_id'))
+        batch_op.drop_constraint('uq_user_events_user_id_event_id', type_='unique')
+
+    with op.batch_alter_table('event_organizers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_event_organizers_event_id'))
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tickets_user_id'))
+        batch_op.drop_index(batch_op.f('ix_tickets_event_id'))
+
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,37 @@
+"""event listing indexes
+
+Revision ID: 52de62150aa0
+Revises: 92bdece85420
+Create Date: 2026-10-17 10:03:18.550932
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '52de62150aa0'
+down_revision = '92bdece85420'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination needs a total order on (datetime, id)
+    op.execute('UPDATE events SET datetime = CURRENT_TIMESTAMP WHERE datetime IS NULL')
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.alter_column('datetime',
+               existing_type=sa.DateTime(),
+               nullable=False)
+        batch_op.create_index('ix_events_datetime_id', ['datetime', 'id'], unique=False)
+        batch_op.create_index('ix_events_location_datetime_id', ['location', 'datetime', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_location_datetime_id')
+        batch_op.drop_index('ix_events_datetime_id')
+        batch_op.alter_column('datetime',
+               existing_type=sa.DateTime(),
+               nullable=True)
@@ -0,0 +1,34 @@
+"""order ticket survives archiving
+
+Revision ID: 5f3a9c1e7b24
+Revises: e85a29561c0b
+Create Date: 2026-10-17 20:05:12.481337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f3a9c1e7b24'
+down_revision = 'e85a29561c0b'
+branch_labels = None
+depends_on = None
+
+# The constraint was created unnamed; these name it on SQLite's table copy
+naming_convention = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def upgrade():
+    # orders.ticket_id keeps pointing at the ticket once it moves to
+    # tickets_archive, so it can't reference tickets
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('orders_ticket_id_fkey', 'orders', type_='foreignkey')
+    else:
+        with op.batch_alter_table('orders', schema=None, naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint('fk_orders_ticket_id_tickets', type_='foreignkey')
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_foreign_key('orders_ticket_id_fkey', 'tickets', ['ticket_id'], ['id'])
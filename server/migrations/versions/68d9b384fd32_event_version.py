@@ -0,0 +1,26 @@
+"""event version
+
+Revision ID: 68d9b384fd32
+Revises: 81bae6d9fac7
+Create Date: 2026-10-17 16:10:48.203511
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '68d9b384fd32'
+down_revision = '81bae6d9fac7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,47 @@
+"""event stats
+
+Revision ID: 81bae6d9fac7
+Revises: 07f2954b9272
+Create Date: 2026-10-17 15:02:33.481207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '81bae6d9fac7'
+down_revision = '07f2954b9272'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('event_stats',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('tickets_sold', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('registrations', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+    with op.batch_alter_table('event_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_event_stats_tickets_sold', ['tickets_sold'], unique=False)
+
+    # Backfill from existing tickets and registrations
+    op.execute(
+        'INSERT INTO event_stats (event_id, tickets_sold, revenue, registrations, updated_at) '
+        'SELECT events.id, '
+        '(SELECT count(*) FROM tickets WHERE tickets.event_id = events.id), '
+        '(SELECT coalesce(sum(price), 0) FROM tickets WHERE tickets.event_id = events.id), '
+        '(SELECT count(*) FROM user_events WHERE user_events.event_id = events.id), '
+        'CURRENT_TIMESTAMP FROM events'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('event_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_stats_tickets_sold')
+
+    op.drop_table('event_stats')
@@ -0,0 +1,44 @@
+"""ticket inventory
+
+Revision ID: 92bdece85420
+Revises: d328452704a1
+Create Date: 2026-10-17 09:12:41.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '92bdece85420'
+down_revision = 'd328452704a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('number_of_tickets', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.alter_column('price',
+               existing_type=sa.Float(),
+               server_default='0',
+               existing_nullable=False)
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('phone_number', sa.String(), nullable=True))
+        batch_op.create_foreign_key('tickets_user_id_fkey', 'users', ['user_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_constraint('tickets_user_id_fkey', type_='foreignkey')
+        batch_op.drop_column('phone_number')
+        batch_op.drop_column('user_id')
+        batch_op.alter_column('price',
+               existing_type=sa.Float(),
+               server_default=None,
+               existing_nullable=False)
+
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_column('number_of_tickets')
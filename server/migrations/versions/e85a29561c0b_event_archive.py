@@ -0,0 +1,75 @@
+"""event archive
+
+Revision ID: e85a29561c0b
+Revises: 2cd92028dad7
+Create Date: 2026-10-17 18:41:27.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e85a29561c0b'
+down_revision = '2cd92028dad7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_events_active_datetime_id', ['datetime', 'id'], unique=False,
+                              postgresql_where=sa.text('archived_at IS NULL'),
+                              sqlite_where=sa.text('archived_at IS NULL'))
+
+    # Partitions per year are created by the archive job on Postgres
+    op.create_table('tickets_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('event_datetime', sa.DateTime(), nullable=False),
+    sa.Column('ticket_number', sa.String(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('seat', sa.Integer(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'event_datetime'),
+    postgresql_partition_by='RANGE (event_datetime)'
+    )
+    with op.batch_alter_table('tickets_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tickets_archive_event_id'), ['event_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tickets_archive_user_id'), ['user_id'], unique=False)
+
+    op.create_table('user_events_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('event_datetime', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('event_id', sa.Integer(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'event_datetime'),
+    postgresql_partition_by='RANGE (event_datetime)'
+    )
+    with op.batch_alter_table('user_events_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_events_archive_event_id'), ['event_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_user_events_archive_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_events_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_events_archive_user_id'))
+        batch_op.drop_index(batch_op.f('ix_user_events_archive_event_id'))
+
+    op.drop_table('user_events_archive')
+    with op.batch_alter_table('tickets_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tickets_archive_user_id'))
+        batch_op.drop_index(batch_op.f('ix_tickets_archive_event_id'))
+
+    op.drop_table('tickets_archive')
+    with op.batch_alter_table('events', schema=None) as batch_op:
+        batch_op.drop_index('ix_events_active_datetime_id')
+        batch_op.drop_column('archived_at')
@@ -1,9 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
 from sqlalchemy_serializer import SerializerMixin
+from database import RoutingSession
 import datetime
+import uuid
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model, SerializerMixin):
     __tablename__ = 'users'
@@ -20,6 +23,11 @@ class User(db.Model, SerializerMixin):
     serialize_only = ('id', 'email', 'username', 'is_admin', 'is_active')
     exclude = ('user_events', 'password_hash')
 
+    # Case-insensitive email lookups in Users.get
+    __table_args__ = (
+        db.Index('ix_users_email_lower', db.func.lower(email)),
+    )
+
     def __repr__(self):
         return f'<User {self.id}, {self.username}, is_admin={self.is_admin}, is_active={self.is_active}>'
 
@@ -35,31 +43,69 @@ class Event(db.Model, SerializerMixin):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     image = db.Column(db.String, nullable=False)
     name = db.Column(db.String, nullable=False)
-    datetime = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    datetime = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
     location = db.Column(db.Text, nullable=False)
     capacity = db.Column(db.Integer, nullable=False)
     description = db.Column(db.Text)
+    number_of_tickets = db.Column(db.Integer, nullable=False, default=0)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    # Bumped on every edit; ORM flushes and bulk updates check it
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Set when the event's tickets and registrations move to the archive tables
+    archived_at = db.Column(db.DateTime)
 
     user_events = db.relationship('UserEvent', backref='event')
     tickets = db.relationship('Ticket', backref='event')
     event_organizers = db.relationship('EventOrganizer', backref='event')
 
-    serialize_only = ('id', 'image', 'name', 'datetime', 'location', 'capacity', 'description')
+    serialize_only = ('id', 'image', 'name', 'datetime', 'location', 'capacity', 'description', 'number_of_tickets', 'latitude', 'longitude', 'version')
     exclude = ('user_events', 'tickets', 'event_organizers')
 
+    __mapper_args__ = {'version_id_col': version}
+
+    # Keyset pagination on (datetime, id), optionally narrowed by location
+    __table_args__ = (
+        db.Index('ix_events_datetime_id', 'datetime', 'id'),
+        db.Index('ix_events_location_datetime_id', 'location', 'datetime', 'id'),
+        db.Index('ix_events_latitude_longitude', 'latitude', 'longitude'),
+        # Listings skip archived events by default
+        db.Index(
+            'ix_events_active_datetime_id', 'datetime', 'id',
+            postgresql_where=archived_at.is_(None), sqlite_where=archived_at.is_(None)
+        ),
+    )
+
     def __repr__(self):
         return f'<Event {self.id}, {self.name}>'
 
+# Postgres full-text search column and its GIN index, as in migration
+# 07f2954b9272, so create_all builds it too. It's left off the mapped columns:
+# other databases don't have it, and only search.py queries it.
+event.listen(Event.__table__, 'after_create', DDL(
+    "ALTER TABLE events ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(location, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+    ") STORED; "
+    'CREATE INDEX ix_events_search_vector ON events USING gin (search_vector)'
+).execute_if(dialect='postgresql'))
+
 class UserEvent(db.Model, SerializerMixin):
     __tablename__ = 'user_events'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'))
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), index=True)
 
     serialize_only = ('id', 'user_id', 'event_id')
     exclude = ('user', 'event')
 
+    # Also serves lookups by user_id as the leading column
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'event_id', name='uq_user_events_user_id_event_id'),
+    )
+
     def __repr__(self):
         return f'<UserEvent {self.id}, user_id={self.user_id}, event_id={self.event_id}>'
 
@@ -67,12 +113,22 @@ class Ticket(db.Model, SerializerMixin):
     __tablename__ = 'tickets'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    price = db.Column(db.Float, nullable=False)
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'))
+    ticket_number = db.Column(db.String, unique=True, nullable=False, default=lambda: uuid.uuid4().hex)
+    price = db.Column(db.Float, nullable=False, default=0.0)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    phone_number = db.Column(db.String)
+    # Seat index for reserved-seating events; NULL for general admission
+    seat = db.Column(db.Integer)
 
-    serialize_only = ('id', 'price', 'event_id')
+    serialize_only = ('id', 'ticket_number', 'price', 'event_id', 'user_id', 'seat')
     exclude = ('event',)
 
+    # A seat can only be sold once per event; NULLs don't collide
+    __table_args__ = (
+        db.UniqueConstraint('event_id', 'seat', name='uq_tickets_event_id_seat'),
+    )
+
     def __repr__(self):
         return f'<Ticket {self.id}, price={self.price}, event_id={self.event_id}>'
 
@@ -81,10 +137,141 @@ class EventOrganizer(db.Model, SerializerMixin):
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     organizer_name = db.Column(db.String, nullable=False)
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'))
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), index=True)
 
     serialize_only = ('id', 'organizer_name', 'event_id')
     exclude = ('event',)
 
     def __repr__(self):
         return f'<EventOrganizer {self.id}, organizer_name={self.organizer_name}, event_id={self.event_id}>'
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}, expires_at={self.expires_at}>'
+
+class Order(db.Model, SerializerMixin):
+    __tablename__ = 'orders'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    idempotency_key = db.Column(db.String, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
+    phone_number = db.Column(db.String, nullable=False)
+    status = db.Column(db.String, nullable=False, default='pending')
+    error = db.Column(db.String)
+    # No foreign key: once the event is archived the ticket lives in
+    # tickets_archive, under the same id
+    ticket_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+
+    serialize_only = ('id', 'event_id', 'status', 'error', 'ticket_id', 'created_at', 'processed_at')
+
+    # A client retry with the same key finds the existing order; workers
+    # claim pending orders in id order
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='uq_orders_user_id_idempotency_key'),
+        db.Index('ix_orders_status_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<Order {self.id}, event_id={self.event_id}, status={self.status}>'
+
+class EventStats(db.Model):
+    __tablename__ = 'event_stats'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    tickets_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    registrations = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    # Dashboard ranking by sales
+    __table_args__ = (
+        db.Index('ix_event_stats_tickets_sold', 'tickets_sold'),
+    )
+
+    def __repr__(self):
+        return f'<EventStats {self.event_id}, tickets_sold={self.tickets_sold}, registrations={self.registrations}>'
+
+class SeatMap(db.Model):
+    __tablename__ = 'seat_maps'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    rows = db.Column(db.Integer, nullable=False)
+    seats_per_row = db.Column(db.Integer, nullable=False)
+    # One bit per seat, most significant bit of the first byte is seat 0
+    sold = db.Column(db.LargeBinary, nullable=False)
+    held = db.Column(db.LargeBinary, nullable=False)
+    # Bumped on every bitmap change; writers compare-and-swap on it
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<SeatMap {self.event_id}, {self.rows}x{self.seats_per_row}>'
+
+class SeatHold(db.Model, SerializerMixin):
+    __tablename__ = 'seat_holds'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    seats = db.Column(db.JSON, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    serialize_only = ('id', 'event_id', 'seats', 'expires_at')
+
+    # The sweep looks for expired holds, optionally for one event
+    __table_args__ = (
+        db.Index('ix_seat_holds_expires_at', 'expires_at'),
+        db.Index('ix_seat_holds_event_id_expires_at', 'event_id', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f'<SeatHold {self.id}, event_id={self.event_id}, seats={len(self.seats)}>'
+
+# Archive tables for tickets and registrations of past events, written by
+# archive.archive_events. Rows keep their ids and carry the event's datetime,
+# which on Postgres range-partitions the tables by year so old years can be
+# detached or dropped wholesale.
+class TicketArchive(db.Model, SerializerMixin):
+    __tablename__ = 'tickets_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    event_datetime = db.Column(db.DateTime, primary_key=True)
+    ticket_number = db.Column(db.String, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    phone_number = db.Column(db.String)
+    seat = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    serialize_only = Ticket.serialize_only
+
+    __table_args__ = {'postgresql_partition_by': 'RANGE (event_datetime)'}
+
+    def __repr__(self):
+        return f'<TicketArchive {self.id}, event_id={self.event_id}>'
+
+class UserEventArchive(db.Model, SerializerMixin):
+    __tablename__ = 'user_events_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    event_datetime = db.Column(db.DateTime, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    serialize_only = UserEvent.serialize_only
+
+    __table_args__ = {'postgresql_partition_by': 'RANGE (event_datetime)'}
+
+    def __repr__(self):
+        return f'<UserEventArchive {self.id}, user_id={self.user_id}, event_id={self.event_id}>'
@@ -0,0 +1,119 @@
+import time
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from models import db, Order, Ticket
+from inventory import reserve_tickets, event_exists
+from cache import invalidate_events
+from stats import record_ticket_sale
+from availability import publish_availability
+
+# Queued ticket purchases. Tickets.post can accept an order with an
+# Idempotency-Key and return immediately; workers then claim pending orders in
+# batches and commit each batch in one transaction, which turns a flash-sale
+# spike into a steady stream of group commits. The orders table is the queue,
+# so no broker is needed.
+#
+# On Postgres any number of workers can run: batches are claimed with
+# FOR UPDATE SKIP LOCKED. SQLite ignores row locks, so run a single worker.
+
+# Only the (user_id, idempotency_key) constraint means a retry; anything else,
+# such as a foreign key violation, is a real error. Postgres names the
+# constraint in its message, SQLite lists the columns.
+def _duplicate_key(error):
+    message = str(error.orig)
+    return 'uq_orders_user_id_idempotency_key' in message or 'orders.user_id, orders.idempotency_key' in message
+
+# Returns (order, created). A repeated key returns the existing order.
+def enqueue_order(user_id, idempotency_key, event_id, phone_number):
+    order = Order(
+        user_id=user_id,
+        idempotency_key=idempotency_key,
+        event_id=event_id,
+        phone_number=phone_number
+    )
+    db.session.add(order)
+    try:
+        db.session.commit()
+        return order, True
+    except IntegrityError as e:
+        db.session.rollback()
+        if not _duplicate_key(e):
+            raise
+    existing = db.session.scalar(
+        select(Order).where(Order.user_id == user_id, Order.idempotency_key == idempotency_key)
+    )
+    return existing, False
+
+# Returns the event's remaining tickets, or None if the order failed
+def _process(order):
+    remaining = reserve_tickets(order.event_id)
+    if remaining is None:
+        order.status = 'failed'
+        order.error = 'No tickets available' if event_exists(order.event_id) else 'Event not found'
+        return None
+    ticket = Ticket(user_id=order.user_id, event_id=order.event_id, phone_number=order.phone_number)
+    db.session.add(ticket)
+    db.session.flush()
+    record_ticket_sale(ticket.event_id, ticket.price)
+    order.status = 'completed'
+    order.ticket_id = ticket.id
+    return remaining
+
+# Claim and process up to batch_size pending orders in one transaction.
+# Returns the number of orders processed.
+def process_orders(batch_size):
+    orders = db.session.scalars(
+        select(Order)
+        .where(Order.status == 'pending')
+        .order_by(Order.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not orders:
+        db.session.rollback()
+        return 0
+
+    now = datetime.utcnow()
+    # Orders run in sequence, so the last count per event is the final one
+    remaining = {}
+    for order in orders:
+        try:
+            with db.session.begin_nested():
+                count = _process(order)
+            if count is not None:
+                remaining[order.event_id] = count
+        except Exception as e:
+            order.status = 'failed'
+            order.error = str(e)
+        order.processed_at = now
+    db.session.commit()
+    invalidate_events({order.event_id for order in orders if order.status == 'completed'})
+    for event_id, count in remaining.items():
+        publish_availability(event_id, count)
+    return len(orders)
+
+# Worker loop used by the process-orders CLI command and the optional
+# in-process worker thread
+def run_order_worker(app, batch_size, interval, stop=None):
+    while stop is None or not stop.is_set():
+        with app.app_context():
+            try:
+                processed = process_orders(batch_size)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Order batch failed')
+                processed = 0
+        # Keep draining while there is a backlog; sleep only when idle
+        if not processed:
+            time.sleep(interval)
+
+# Wait up to timeout seconds for an order to leave the pending state
+def wait_for_order(order, timeout, poll_interval=0.25):
+    deadline = time.monotonic() + timeout
+    while order.status == 'pending' and time.monotonic() < deadline:
+        # Release the pooled connection while sleeping
+        db.session.rollback()
+        time.sleep(poll_interval)
+        db.session.refresh(order)
+    return order
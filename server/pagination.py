@@ -0,0 +1,39 @@
+import base64
+from datetime import datetime
+
+# Keyset cursors encode the (datetime, id) of the last row on a page, so the
+# next page is a range scan on the composite index instead of an OFFSET.
+
+CURSOR_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+def encode_cursor(dt, id):
+    raw = f'{dt.strftime(CURSOR_DATETIME_FORMAT)}|{id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        dt, id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.strptime(dt, CURSOR_DATETIME_FORMAT), int(id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def parse_limit(value, default, maximum):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        return None
+    if limit < 1:
+        return None
+    return min(limit, maximum)
+
+# Accepts ISO 8601 strings; returns None when the value can't be parsed
+def parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,144 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import g, request
+from redis_client import redis_for
+
+# Admission control in front of the resources.
+#
+# Rate limits are token buckets keyed by rule and client: the JWT identity when
+# the request is authenticated, otherwise the remote address. A rule refills
+# at limit/period tokens per second up to limit, so a client can burst `limit`
+# requests and then sustain the average. Over-limit requests get a 429 with
+# Retry-After set to when the next token arrives.
+#
+# The concurrency limiter caps requests in flight per process so excess load
+# is shed with a 503 while there are still database connections to serve the
+# requests already admitted, instead of every request queueing on the pool.
+#
+# Config (read from the app by init_rate_limits):
+#   RATE_LIMITS              comma-separated endpoint:method=limit/seconds,
+#                            e.g. 'login:post=10/60,tickets:post=30/60'
+#   RATE_LIMIT_DEFAULT       limit/seconds for every other endpoint; unset is none
+#   RATE_LIMIT_URL           redis:// URL, overriding REDIS_URL, so buckets are
+#                            shared by all workers; with neither set they're
+#                            per process
+#   RATE_LIMIT_MAX_KEYS      in-process buckets kept before the oldest are dropped
+#   MAX_CONCURRENT_REQUESTS  requests in flight per process; 0 disables
+#   ADMISSION_TIMEOUT        seconds a request waits for a slot before the 503
+
+EXEMPT_ENDPOINTS = {'metrics', 'static'}
+# Long-lived streams would hold a slot for minutes; they have their own cap
+# (AVAILABILITY_MAX_STREAMS) and release their connection between reads
+UNSLOTTED_ENDPOINTS = {'eventavailability'}
+
+def parse_rule(value):
+    limit, seconds = value.split('/')
+    return int(limit), float(seconds)
+
+def parse_rules(value):
+    rules = {}
+    for item in (value or '').split(','):
+        if item.strip():
+            name, rule = item.split('=')
+            rules[name.strip()] = parse_rule(rule.strip())
+    return rules
+
+class MemoryBuckets:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Take one token; returns 0 if allowed, else seconds until one is available
+    def take(self, key, limit, seconds):
+        rate = limit / seconds
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+# Same bucket arithmetic run atomically on a Redis-compatible server, using the
+# server's clock so workers on different hosts agree
+TAKE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or limit
+local updated = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(limit / rate) + 1)
+return tostring(wait)
+"""
+
+class RedisBuckets:
+    def __init__(self, client, prefix='epic:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, limit, seconds):
+        return float(self._take(keys=[self.prefix + key], args=[limit, limit / seconds]))
+
+def client_identity():
+    user = getattr(request, 'user', None)
+    if user is not None:
+        return f"user:{user['id']}"
+    return f'ip:{request.remote_addr}'
+
+def init_rate_limits(app):
+    rules = parse_rules(app.config.get('RATE_LIMITS'))
+    default = app.config.get('RATE_LIMIT_DEFAULT')
+    default = parse_rule(default) if default else None
+    client = redis_for(app, 'RATE_LIMIT_URL')
+    if client is not None:
+        buckets = RedisBuckets(client)
+    else:
+        buckets = MemoryBuckets(app.config.get('RATE_LIMIT_MAX_KEYS', 100000))
+
+    max_concurrent = app.config.get('MAX_CONCURRENT_REQUESTS', 0)
+    timeout = app.config.get('ADMISSION_TIMEOUT', 0.1)
+    slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+    # Runs after the auth hook so request.user is known
+    @app.before_request
+    def admit_request():
+        if request.endpoint is None or request.endpoint in EXEMPT_ENDPOINTS or request.method == 'OPTIONS':
+            return None
+
+        name = f'{request.endpoint}:{request.method.lower()}'
+        rule = rules.get(name, default)
+        if rule is not None:
+            wait = buckets.take(f'{name}:{client_identity()}', *rule)
+            if wait > 0:
+                return {'error': 'Too many requests'}, 429, {'Retry-After': str(math.ceil(wait))}
+
+        if slots is not None and request.endpoint not in UNSLOTTED_ENDPOINTS:
+            if not slots.acquire(timeout=timeout):
+                return {'error': 'Server busy, please retry shortly'}, 503, {'Retry-After': '1'}
+            g.admitted = True
+        return None
+
+    @app.teardown_request
+    def release_request_slot(exc):
+        if g.pop('admitted', False):
+            slots.release()
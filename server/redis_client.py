@@ -0,0 +1,30 @@
+try:
+    import redis
+except ImportError:  # Redis is optional; every feature that uses it has an in-process fallback
+    redis = None
+
+# Shared Redis access for the features that can keep their state in a
+# Redis-compatible server so every worker sees it: the event cache, rate
+# limits, live availability fan-out and replica read-your-writes marks.
+#
+# REDIS_URL is the default server for all of them; CACHE_URL, RATE_LIMIT_URL,
+# AVAILABILITY_URL and REPLICA_STICKY_URL point a single feature elsewhere.
+# A feature with neither set keeps its state per process.
+#
+# Clients are shared per URL, so features on the same server share one
+# connection pool (redis-py replaces it after a fork).
+
+_clients = {}
+
+# Client for the feature configured by setting, or None when it runs in-process
+def redis_for(app, setting):
+    url = app.config.get(setting) or app.config.get('REDIS_URL')
+    if not url:
+        return None
+    if redis is None:
+        name = setting if app.config.get(setting) else 'REDIS_URL'
+        raise RuntimeError(f'{name} is set but the redis package is not installed')
+    client = _clients.get(url)
+    if client is None:
+        client = _clients[url] = redis.Redis.from_url(url)
+    return client
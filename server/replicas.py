@@ -0,0 +1,261 @@
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from flask import g, request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from database import engine_options
+from models import db
+from ratelimit import client_identity
+from redis_client import redis_for
+
+# Read replica routing. Each replica gets its own engine with the primary's
+# pool settings; they aren't Flask-SQLAlchemy binds, so create_all and
+# drop_all never touch them. Each GET/HEAD request picks one in before_request
+# and db.session (database.RoutingSession) sends its queries there; every
+# other request, and any flush, stays on the primary.
+#
+# Read-your-writes: a successful write marks the client (JWT identity, else
+# remote address) and its reads go to the primary for REPLICA_STICKY_SECONDS,
+# so a user sees their own purchase straight away. Keep it above
+# REPLICA_MAX_LAG_SECONDS. With Redis configured the marks hold across
+# workers; otherwise they're per process.
+#
+# A replica is checked at most every REPLICA_CHECK_SECONDS, from whichever
+# request finds the check due. One that can't be reached, or raises a
+# connection error mid-request, is skipped for REPLICA_RETRY_SECONDS; one
+# lagging more than REPLICA_MAX_LAG_SECONDS is skipped until a check finds it
+# caught up. With no replica usable, reads fall back to the primary, and a
+# request whose replica fails under it is re-run there (primary_fallback,
+# applied to every resource). Lag is measured on Postgres streaming replicas;
+# other databases report 0.
+#
+# Reads served by a replica can fill the event cache, so a cached entry may be
+# up to REPLICA_MAX_LAG_SECONDS older than its invalidation.
+#
+# Config (read from the app by init_replicas):
+#   DATABASE_REPLICA_URLS    comma-separated replica URLs; empty disables
+#   REPLICA_SELECTION        round_robin, or least_connections (fewest
+#                            requests in flight in this process)
+#   REPLICA_MAX_LAG_SECONDS  replicas further behind are skipped
+#   REPLICA_CHECK_SECONDS    how often each replica's health and lag is checked
+#   REPLICA_RETRY_SECONDS    how long an unreachable replica is skipped
+#   REPLICA_STICKY_SECONDS   primary-only window after a client's write
+#   REPLICA_STICKY_URL       redis:// URL, overriding REDIS_URL, so stickiness
+#                            holds across workers
+
+READ_METHODS = {'GET', 'HEAD'}
+
+LAG_QUERIES = {
+    'postgresql': (
+        'SELECT CASE WHEN NOT pg_is_in_recovery() '
+        'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+    ),
+}
+
+class Replica:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.in_flight = 0
+        self.lag = 0.0
+        self.checked_at = None
+        self.down_until = 0.0
+        self._lock = threading.Lock()
+        event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        # Connection failures, not query errors, take the replica out
+        if context.is_disconnect or context.connection is None:
+            self.down_until = time.monotonic() + _settings['retry_seconds']
+
+    def down(self):
+        return time.monotonic() < self.down_until
+
+    def check(self):
+        query = LAG_QUERIES.get(self.engine.dialect.name, 'SELECT 0')
+        try:
+            with self.engine.connect() as connection:
+                self.lag = float(connection.execute(text(query)).scalar() or 0)
+        except Exception:
+            self.down_until = time.monotonic() + _settings['retry_seconds']
+        self.checked_at = time.monotonic()
+
+    def usable(self):
+        if self.down():
+            return False
+        if self.checked_at is None or time.monotonic() - self.checked_at >= _settings['check_seconds']:
+            # One thread checks; the rest go by the last result
+            if self._lock.acquire(blocking=False):
+                try:
+                    self.check()
+                finally:
+                    self._lock.release()
+            elif self.checked_at is None:
+                return False
+        return not self.down() and self.lag <= _settings['max_lag_seconds']
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'url': self.engine.url.render_as_string(hide_password=True),
+            'in_flight': self.in_flight,
+            'lag_seconds': round(self.lag, 3),
+            'down': self.down(),
+        }
+
+class ReplicaSet:
+    def __init__(self, replicas, selection):
+        self.replicas = replicas
+        self.selection = selection
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self.replica_reads = self.primary_reads = 0
+
+    def choose(self):
+        if self.selection == 'least_connections':
+            candidates = sorted(self.replicas, key=lambda replica: replica.in_flight)
+        else:
+            start = next(self._next) % len(self.replicas)
+            candidates = self.replicas[start:] + self.replicas[:start]
+        for replica in candidates:
+            if replica.usable():
+                with self._lock:
+                    replica.in_flight += 1
+                    self.replica_reads += 1
+                return replica
+        with self._lock:
+            self.primary_reads += 1
+        return None
+
+    def release(self, replica):
+        with self._lock:
+            replica.in_flight -= 1
+
+    def stats(self):
+        return {
+            'selection': self.selection,
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+            'replicas': [replica.stats() for replica in self.replicas],
+        }
+
+class MemoryStickiness:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._until = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, key, seconds):
+        with self._lock:
+            self._until.pop(key, None)
+            self._until[key] = time.monotonic() + seconds
+            while len(self._until) > self.max_keys:
+                self._until.popitem(last=False)
+
+    def is_sticky(self, key):
+        until = self._until.get(key)
+        return until is not None and until > time.monotonic()
+
+class RedisStickiness:
+    def __init__(self, client, prefix='epic:primary:'):
+        self.client = client
+        self.prefix = prefix
+
+    def mark(self, key, seconds):
+        self.client.set(self.prefix + key, 1, px=int(seconds * 1000))
+
+    def is_sticky(self, key):
+        return bool(self.client.exists(self.prefix + key))
+
+replica_set = None
+_settings = {
+    'max_lag_seconds': 5.0,
+    'check_seconds': 5.0,
+    'retry_seconds': 30.0,
+}
+
+def init_replicas(app):
+    global replica_set
+    urls = [url.strip() for url in (app.config.get('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+    if not urls:
+        replica_set = None
+        return
+    selection = app.config.get('REPLICA_SELECTION', 'round_robin')
+    if selection not in ('round_robin', 'least_connections'):
+        raise RuntimeError(f'Unknown REPLICA_SELECTION: {selection}')
+    _settings.update(
+        max_lag_seconds=app.config.get('REPLICA_MAX_LAG_SECONDS', 5.0),
+        check_seconds=app.config.get('REPLICA_CHECK_SECONDS', 5.0),
+        retry_seconds=app.config.get('REPLICA_RETRY_SECONDS', 30.0),
+    )
+    sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 10.0)
+    client = redis_for(app, 'REPLICA_STICKY_URL')
+    if client is not None:
+        stickiness = RedisStickiness(client)
+    else:
+        stickiness = MemoryStickiness()
+
+    replica_set = ReplicaSet(
+        [Replica(f'replica_{index}', create_engine(url, **engine_options(url, app.config))) for index, url in enumerate(urls)],
+        selection
+    )
+    replicas = replica_set
+
+    def is_sticky():
+        try:
+            return stickiness.is_sticky(client_identity())
+        except Exception:
+            # Without the marks, the primary is the safe choice
+            return True
+
+    # Runs after the auth hook so the client is known
+    @app.before_request
+    def route_reads():
+        if request.method not in READ_METHODS or is_sticky():
+            return
+        replica = replicas.choose()
+        if replica is not None:
+            g.read_replica = replica
+            g.read_engine = replica.engine
+
+    @app.after_request
+    def mark_writer(response):
+        if request.method not in READ_METHODS and request.method != 'OPTIONS' and response.status_code < 400:
+            try:
+                stickiness.mark(client_identity(), sticky_seconds)
+            except Exception:
+                pass
+        return response
+
+    @app.teardown_request
+    def release_replica(exc):
+        replica = g.pop('read_replica', None)
+        if replica is not None:
+            g.pop('read_engine', None)
+            replicas.release(replica)
+
+# Resource decorator: re-run a read on the primary when its replica went down
+# during the request. Reads are idempotent, so running the view twice is safe.
+def primary_fallback(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except OperationalError:
+            replica = g.get('read_replica')
+            if replica is None or g.get('read_engine') is None or not replica.down():
+                raise
+            db.session.close()
+            g.pop('read_engine')
+            return view(*args, **kwargs)
+    return wrapper
+
+def replica_engines():
+    return [replica.engine for replica in replica_set.replicas] if replica_set is not None else []
+
+def replica_stats():
+    return replica_set.stats() if replica_set is not None else None
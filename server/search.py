@@ -0,0 +1,160 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import select, text
+from models import db, Event
+
+# Full-text and radius search over events.
+#
+# On Postgres this queries the generated events.search_vector tsvector column
+# through its GIN index (name weighted above location above description) and
+# ranks with ts_rank_cd. Elsewhere it falls back to an in-process inverted
+# index. The index is rebuilt when an event's content changes (the
+# event_content generation, which ticket sales don't touch) and at least every
+# SEARCH_INDEX_MAX_AGE seconds, so events written by other workers show up
+# even when their generation bumps don't reach this process (no Redis cache).
+# One thread rebuilds while the others keep searching the previous index.
+# Both paths match every query term, treating each term as a prefix, and skip
+# archived events unless include_archived is set.
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+WEIGHTS = {'name': 3.0, 'location': 2.0, 'description': 1.0}
+EARTH_RADIUS_KM = 6371.0
+
+def tokenize(value):
+    return TOKEN.findall(value.lower()) if value else []
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+# Latitude/longitude box that contains the circle, for an indexable prefilter
+def bounding_box(lat, lng, radius_km):
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlng = math.degrees(radius_km / (EARTH_RADIUS_KM * max(math.cos(math.radians(lat)), 1e-6)))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+class InvertedIndex:
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+        self.locations = {}
+        self.archived = set()
+
+    @classmethod
+    def build(cls, rows):
+        index = cls()
+        postings = defaultdict(lambda: defaultdict(float))
+        for row in rows:
+            for field, weight in WEIGHTS.items():
+                for token in tokenize(getattr(row, field)):
+                    postings[token][row.id] += weight
+            if row.latitude is not None and row.longitude is not None:
+                index.locations[row.id] = (row.latitude, row.longitude)
+            if row.archived_at is not None:
+                index.archived.add(row.id)
+        index.postings = {token: dict(scores) for token, scores in postings.items()}
+        index.tokens = sorted(index.postings)
+        return index
+
+    # Best score per event over all indexed tokens starting with prefix
+    def _prefix_scores(self, prefix):
+        scores = {}
+        start = bisect.bisect_left(self.tokens, prefix)
+        for token in self.tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            for event_id, score in self.postings[token].items():
+                if score > scores.get(event_id, 0):
+                    scores[event_id] = score
+        return scores
+
+    def search(self, terms, limit, near=None, include_archived=False):
+        ranked = None
+        for term in terms:
+            scores = self._prefix_scores(term)
+            if ranked is None:
+                ranked = scores
+            else:
+                ranked = {event_id: ranked[event_id] + score for event_id, score in scores.items() if event_id in ranked}
+            if not ranked:
+                return []
+
+        candidates = ranked.items()
+        if not include_archived:
+            candidates = [(event_id, score) for event_id, score in candidates if event_id not in self.archived]
+        if near:
+            lat, lng, radius_km = near
+            candidates = [
+                (event_id, score) for event_id, score in candidates
+                if event_id in self.locations and haversine_km(lat, lng, *self.locations[event_id]) <= radius_km
+            ]
+        return heapq.nlargest(limit, candidates, key=lambda item: (item[1], -item[0]))
+
+_index = None
+_index_generation = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+def _index_fresh(generation, max_age):
+    return _index is not None and _index_generation == generation and time.monotonic() - _index_built_at < max_age
+
+def _memory_index(generation, max_age):
+    global _index, _index_generation, _index_built_at
+    index = _index
+    if _index_fresh(generation, max_age):
+        return index
+    # Only the first search has to wait for a build
+    if not _index_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if not _index_fresh(generation, max_age):
+            built_at = time.monotonic()
+            rows = db.session.execute(
+                select(Event.id, Event.name, Event.location, Event.description, Event.latitude, Event.longitude, Event.archived_at)
+                .execution_options(yield_per=5000)
+            )
+            _index = InvertedIndex.build(rows)
+            _index_generation = generation
+            _index_built_at = built_at
+        return _index
+    finally:
+        _index_lock.release()
+
+def _postgres_search(terms, limit, near, include_archived):
+    query = ' & '.join(f'{term}:*' for term in terms)
+    sql = (
+        'SELECT id, ts_rank_cd(search_vector, query) AS rank FROM events, '
+        "to_tsquery('english', :query) AS query WHERE search_vector @@ query"
+    )
+    params = {'query': query, 'limit': limit}
+    if not include_archived:
+        sql += ' AND archived_at IS NULL'
+    if near:
+        lat, lng, radius_km = near
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        sql += (
+            ' AND latitude BETWEEN :min_lat AND :max_lat AND longitude BETWEEN :min_lng AND :max_lng'
+            ' AND 2 * :earth_radius * asin(sqrt('
+            'power(sin(radians(latitude - :lat) / 2), 2) + '
+            'cos(radians(:lat)) * cos(radians(latitude)) * power(sin(radians(longitude - :lng) / 2), 2)'
+            ')) <= :radius'
+        )
+        params.update(min_lat=min_lat, max_lat=max_lat, min_lng=min_lng, max_lng=max_lng,
+                      lat=lat, lng=lng, radius=radius_km, earth_radius=EARTH_RADIUS_KM)
+    sql += ' ORDER BY rank DESC, id LIMIT :limit'
+    return [(row.id, row.rank) for row in db.session.execute(text(sql), params)]
+
+# Returns [(event_id, rank)] best first. near is (lat, lng, radius_km) or None.
+def search_events(q, limit, near=None, generation=None, max_age=30, include_archived=False):
+    terms = tokenize(q)
+    if not terms:
+        return []
+    if db.engine.dialect.name == 'postgresql':
+        return _postgres_search(terms, limit, near, include_archived)
+    return _memory_index(generation, max_age).search(terms, limit, near, include_archived)
@@ -0,0 +1,214 @@
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, insert, or_, select, update
+from models import db, Event, Order, SeatMap, SeatHold, Ticket
+from inventory import reserve_tickets
+from stats import record_ticket_sale
+
+# Reserved seating. Each event's seat map is one row holding two bitmaps, one
+# bit per seat: sold seats and seats under a temporary hold. A whole map is
+# read with a single primary-key lookup and sent as a base64 bitmap, so a 50k
+# seat venue is ~8 KB rather than 50k rows.
+#
+# Bitmap writers read the row, change bits in Python and write it back with a
+# compare-and-swap on version, retrying if another writer got there first.
+#
+# A hold reserves seats for a user until expires_at. Purchasing it moves the
+# seats from held to sold and creates one ticket per seat; expired holds are
+# released by sweep_holds (flask sweep-holds), and an event's expired holds are
+# also swept before a new hold is placed on it.
+#
+# A seat map replaces the event's general admission inventory, so it can only
+# be added before any tickets are sold or queued.
+
+CAS_ATTEMPTS = 5
+
+class SeatError(Exception):
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+def _mask(seats, size):
+    mask = 0
+    for seat in seats:
+        mask |= 1 << (size - 1 - seat)
+    return mask
+
+def _to_int(bitmap):
+    return int.from_bytes(bitmap, 'big')
+
+def _to_bytes(value, nbytes):
+    return value.to_bytes(nbytes, 'big')
+
+def _seat_count(seat_map):
+    return seat_map.rows * seat_map.seats_per_row
+
+# Apply change(sold, held, size) -> (sold, held) to an event's bitmaps, as ints
+# over len(bitmap) * 8 bits. Joins the caller's transaction.
+def _update_bitmaps(event_id, change):
+    for _ in range(CAS_ATTEMPTS):
+        row = db.session.execute(
+            select(SeatMap.sold, SeatMap.held, SeatMap.version).where(SeatMap.event_id == event_id)
+        ).first()
+        if row is None:
+            raise SeatError('Event has no seat map', 404)
+        nbytes = len(row.sold)
+        sold, held = change(_to_int(row.sold), _to_int(row.held), nbytes * 8)
+        updated = db.session.execute(
+            update(SeatMap)
+            .where(SeatMap.event_id == event_id, SeatMap.version == row.version)
+            .values(sold=_to_bytes(sold, nbytes), held=_to_bytes(held, nbytes), version=SeatMap.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if updated:
+            return
+    raise SeatError('Seat map is busy, please retry', 503)
+
+def create_seat_map(event_id, rows, seats_per_row):
+    # Lock the event row so no general admission sale lands between the check
+    # and the switch to seats
+    db.session.execute(select(Event.id).where(Event.id == event_id).with_for_update())
+    if db.session.get(SeatMap, event_id) is not None:
+        raise SeatError('Event already has a seat map')
+    sold = db.session.scalar(select(or_(
+        exists().where(Ticket.event_id == event_id),
+        exists().where(Order.event_id == event_id, Order.status == 'pending'),
+    )))
+    if sold:
+        raise SeatError('Event already has general admission tickets sold or queued')
+    nbytes = (rows * seats_per_row + 7) // 8
+    seat_map = SeatMap(
+        event_id=event_id,
+        rows=rows,
+        seats_per_row=seats_per_row,
+        sold=bytes(nbytes),
+        held=bytes(nbytes),
+    )
+    db.session.add(seat_map)
+    # Seats are the event's inventory from now on
+    db.session.execute(
+        update(Event).where(Event.id == event_id).values(number_of_tickets=rows * seats_per_row)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return seat_map
+
+# One query for the whole map. Bits are 1 for seats that are neither sold nor
+# held; expired holds count as held until they're swept.
+def seat_availability(event_id):
+    row = db.session.execute(
+        select(SeatMap.rows, SeatMap.seats_per_row, SeatMap.sold, SeatMap.held, SeatMap.version)
+        .where(SeatMap.event_id == event_id)
+    ).first()
+    if row is None:
+        return None
+    nbytes = len(row.sold)
+    size = row.rows * row.seats_per_row
+    all_seats = ((1 << size) - 1) << (nbytes * 8 - size)
+    available = all_seats & ~(_to_int(row.sold) | _to_int(row.held))
+    return {
+        'event_id': event_id,
+        'rows': row.rows,
+        'seats_per_row': row.seats_per_row,
+        'available': base64.b64encode(_to_bytes(available, nbytes)).decode(),
+        'version': row.version,
+    }
+
+def place_hold(event_id, user_id, seats, ttl):
+    seat_map = db.session.get(SeatMap, event_id)
+    if seat_map is None:
+        raise SeatError('Event has no seat map', 404)
+    size = _seat_count(seat_map)
+    if any(not isinstance(seat, int) or isinstance(seat, bool) or not 0 <= seat < size for seat in seats):
+        raise SeatError('Invalid seat', 400)
+    seats = sorted(set(seats))
+
+    sweep_holds(event_id)
+
+    def take(sold, held, bits):
+        mask = _mask(seats, bits)
+        taken = (sold | held) & mask
+        if taken:
+            raise SeatError('Seats unavailable: ' + ', '.join(str(seat) for seat in seats if taken & _mask([seat], bits)))
+        return sold, held | mask
+
+    try:
+        _update_bitmaps(event_id, take)
+        hold = SeatHold(event_id=event_id, user_id=user_id, seats=seats, expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+        db.session.add(hold)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return hold
+
+def _release(event_id, seats):
+    def release(sold, held, bits):
+        return sold, held & ~_mask(seats, bits)
+    _update_bitmaps(event_id, release)
+
+def release_hold(hold):
+    try:
+        # Deleting first claims the hold, so a concurrent sweep or purchase
+        # can't release the same seats twice
+        if db.session.execute(delete(SeatHold).where(SeatHold.id == hold.id)).rowcount:
+            _release(hold.event_id, hold.seats)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+# Turn a hold into tickets. Returns the created tickets' (id, seat) pairs and
+# the event's remaining tickets.
+def purchase_hold(hold, user_id, phone_number):
+    event_id, seats = hold.event_id, list(hold.seats)
+    try:
+        claimed = db.session.execute(
+            delete(SeatHold).where(SeatHold.id == hold.id, SeatHold.expires_at > datetime.utcnow())
+        ).rowcount
+        if not claimed:
+            raise SeatError('Hold has expired', 410)
+
+        def sell(sold, held, bits):
+            mask = _mask(seats, bits)
+            return sold | mask, held & ~mask
+        _update_bitmaps(event_id, sell)
+
+        remaining = reserve_tickets(event_id, len(seats), seated=True)
+        if remaining is None:
+            raise SeatError('No tickets available')
+        tickets = db.session.execute(
+            insert(Ticket).returning(Ticket.id, Ticket.seat, Ticket.price, sort_by_parameter_order=True),
+            [{'event_id': event_id, 'user_id': user_id, 'phone_number': phone_number, 'seat': seat} for seat in seats]
+        ).all()
+        record_ticket_sale(event_id, tickets[0].price, len(tickets))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return [(ticket.id, ticket.seat) for ticket in tickets], remaining
+
+# Release expired holds, for one event or all; returns how many were released
+def sweep_holds(event_id=None, batch_size=500):
+    conditions = [SeatHold.expires_at <= datetime.utcnow()]
+    if event_id is not None:
+        conditions.append(SeatHold.event_id == event_id)
+    released = 0
+    while True:
+        ids = db.session.scalars(select(SeatHold.id).where(*conditions).limit(batch_size)).all()
+        if not ids:
+            return released
+        try:
+            expired = db.session.execute(
+                delete(SeatHold).where(SeatHold.id.in_(ids), *conditions).returning(SeatHold.event_id, SeatHold.seats)
+            ).all()
+            by_event = {}
+            for hold_event_id, seats in expired:
+                by_event.setdefault(hold_event_id, []).extend(seats)
+            for hold_event_id, seats in by_event.items():
+                _release(hold_event_id, seats)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        released += len(expired)
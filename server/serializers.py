@@ -0,0 +1,121 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from time import perf_counter
+from flask import Response, make_response, request, stream_with_context
+from sqlalchemy import select
+from models import db
+from metrics import add_serialization_time
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to Flask-RESTful's encoder
+    orjson = None
+
+# Precomputed serializers built once per model from its serialize_only tuple.
+# SerializerMixin.to_dict walks attributes and rules on every row; here we
+# select just the serialized columns and turn each result tuple into a dict
+# with a generated function, matching to_dict's output format.
+
+def _formatter(model, python_type):
+    if python_type is datetime:
+        fmt = model.datetime_format
+        return lambda value: value.strftime(fmt)
+    if python_type is date:
+        fmt = model.date_format
+        return lambda value: value.strftime(fmt)
+    if python_type is time:
+        fmt = model.time_format
+        return lambda value: value.strftime(fmt)
+    if python_type is Decimal:
+        fmt = model.decimal_format
+        return lambda value: fmt.format(value)
+    return None
+
+class ModelSerializer:
+    def __init__(self, model, fields=None):
+        self.model = model
+        self.fields = tuple(fields or model.serialize_only)
+        self.columns = [getattr(model, name) for name in self.fields]
+
+        namespace = {}
+        items = []
+        for index, (name, column) in enumerate(zip(self.fields, self.columns)):
+            try:
+                python_type = column.type.python_type
+            except NotImplementedError:
+                python_type = None
+            formatter = _formatter(model, python_type)
+            if formatter is None:
+                items.append(f'{name!r}: row[{index}]')
+            else:
+                namespace[f'_f{index}'] = formatter
+                items.append(f'{name!r}: None if row[{index}] is None else _f{index}(row[{index}])')
+        source = 'def serialize(row):\n    return {' + ', '.join(items) + '}\n'
+        exec(source, namespace)
+        self.serialize = namespace['serialize']
+
+    def select(self):
+        return select(*self.columns)
+
+    def all(self, rows):
+        serialize = self.serialize
+        rows = list(rows)
+        start = perf_counter()
+        data = [serialize(row) for row in rows]
+        add_serialization_time(perf_counter() - start)
+        return data
+
+_serializers = {}
+
+def serializer_for(model):
+    serializer = _serializers.get(model)
+    if serializer is None:
+        serializer = _serializers[model] = ModelSerializer(model)
+    return serializer
+
+# Flask-RESTful representation that encodes with orjson
+def output_json(data, code, headers=None):
+    response = make_response(orjson.dumps(data), code)
+    response.headers.extend(headers or {})
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_CHUNK_ROWS = 1000
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode()
+
+# Which streaming format the client asked for, if any: NDJSON via the Accept
+# header, or a chunked JSON array via ?stream=true
+def stream_format():
+    if request.accept_mimetypes.best == NDJSON_MIMETYPE:
+        return 'ndjson'
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return 'json'
+    return None
+
+# Stream a select() built from serializer.select() straight from a server-side
+# cursor, so memory stays bounded by one chunk regardless of table size
+def stream_rows(serializer, statement, format):
+    def generate():
+        result = db.session.execute(statement.execution_options(yield_per=STREAM_CHUNK_ROWS))
+        serialize = serializer.serialize
+        first = True
+        if format == 'json':
+            yield b'['
+        for rows in result.partitions():
+            if format == 'ndjson':
+                yield b''.join(_dumps(serialize(row)) + b'\n' for row in rows)
+            else:
+                chunk = b','.join(_dumps(serialize(row)) for row in rows)
+                yield chunk if first else b',' + chunk
+                first = False
+        if format == 'json':
+            yield b']'
+
+    mimetype = NDJSON_MIMETYPE if format == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
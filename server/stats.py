@@ -0,0 +1,143 @@
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Event, EventStats, Ticket, TicketArchive, UserEvent, UserEventArchive
+
+# Per-event sales and attendance aggregates kept in event_stats. Purchase and
+# registration writes bump them in the same transaction with one upsert, so
+# reads are a primary-key lookup instead of a scan of tickets/user_events.
+# rebuild_event_stats recomputes everything from the source tables.
+
+_dialect_inserts = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def _bump(event_id, tickets_sold=0, revenue=0.0, registrations=0):
+    now = datetime.utcnow()
+    dialect_insert = _dialect_inserts.get(db.engine.dialect.name)
+    if dialect_insert is None:
+        updated = db.session.execute(
+            EventStats.__table__.update()
+            .where(EventStats.event_id == event_id)
+            .values(
+                tickets_sold=EventStats.tickets_sold + tickets_sold,
+                revenue=EventStats.revenue + revenue,
+                registrations=EventStats.registrations + registrations,
+                updated_at=now,
+            )
+        ).rowcount
+        if updated:
+            return
+        dialect_insert = insert
+
+    stmt = dialect_insert(EventStats).values(
+        event_id=event_id,
+        tickets_sold=tickets_sold,
+        revenue=revenue,
+        registrations=registrations,
+        updated_at=now,
+    )
+    if dialect_insert is not insert:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EventStats.event_id],
+            set_={
+                'tickets_sold': EventStats.tickets_sold + stmt.excluded.tickets_sold,
+                'revenue': EventStats.revenue + stmt.excluded.revenue,
+                'registrations': EventStats.registrations + stmt.excluded.registrations,
+                'updated_at': stmt.excluded.updated_at,
+            },
+        )
+    db.session.execute(stmt)
+
+def record_ticket_sale(event_id, price, quantity=1):
+    _bump(event_id, tickets_sold=quantity, revenue=(price or 0.0) * quantity)
+
+def record_registration(event_id):
+    _bump(event_id, registrations=1)
+
+# Recompute every event's aggregates in bulk, in one transaction, counting
+# archived rows too
+def rebuild_event_stats():
+    tickets = union_all(
+        select(Ticket.event_id, Ticket.price),
+        select(TicketArchive.event_id, TicketArchive.price),
+    ).subquery()
+    user_events = union_all(
+        select(UserEvent.event_id),
+        select(UserEventArchive.event_id),
+    ).subquery()
+    sales = (
+        select(tickets.c.event_id, func.count().label('sold'), func.sum(tickets.c.price).label('revenue'))
+        .group_by(tickets.c.event_id)
+        .subquery()
+    )
+    registrations = (
+        select(user_events.c.event_id, func.count().label('registered'))
+        .group_by(user_events.c.event_id)
+        .subquery()
+    )
+    rows = (
+        select(
+            Event.id,
+            func.coalesce(sales.c.sold, 0),
+            func.coalesce(sales.c.revenue, 0.0),
+            func.coalesce(registrations.c.registered, 0),
+            literal(datetime.utcnow()),
+        )
+        .outerjoin(sales, sales.c.event_id == Event.id)
+        .outerjoin(registrations, registrations.c.event_id == Event.id)
+    )
+    db.session.execute(delete(EventStats))
+    result = db.session.execute(
+        insert(EventStats).from_select(
+            ['event_id', 'tickets_sold', 'revenue', 'registrations', 'updated_at'], rows
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+def event_stats(event_id):
+    row = db.session.execute(
+        select(
+            Event.id, Event.capacity, Event.number_of_tickets,
+            EventStats.tickets_sold, EventStats.revenue, EventStats.registrations, EventStats.updated_at,
+        )
+        .outerjoin(EventStats, EventStats.event_id == Event.id)
+        .where(Event.id == event_id)
+    ).first()
+    if row is None:
+        return None
+    return {
+        'event_id': row.id,
+        'capacity': row.capacity,
+        'remaining_tickets': row.number_of_tickets,
+        'tickets_sold': row.tickets_sold or 0,
+        'revenue': row.revenue or 0.0,
+        'registrations': row.registrations or 0,
+        'updated_at': row.updated_at.strftime(Event.datetime_format) if row.updated_at else None,
+    }
+
+def dashboard(top):
+    totals = db.session.execute(
+        select(
+            func.count(EventStats.event_id),
+            func.coalesce(func.sum(EventStats.tickets_sold), 0),
+            func.coalesce(func.sum(EventStats.revenue), 0.0),
+            func.coalesce(func.sum(EventStats.registrations), 0),
+        )
+    ).one()
+    best_sellers = db.session.execute(
+        select(Event.id, Event.name, EventStats.tickets_sold, EventStats.revenue, EventStats.registrations)
+        .join(Event, Event.id == EventStats.event_id)
+        .order_by(EventStats.tickets_sold.desc(), Event.id)
+        .limit(top)
+    ).all()
+    return {
+        'events': totals[0],
+        'tickets_sold': totals[1],
+        'revenue': float(totals[2]),
+        'registrations': totals[3],
+        'top_events': [
+            {'event_id': row.id, 'name': row.name, 'tickets_sold': row.tickets_sold,
+             'revenue': row.revenue, 'registrations': row.registrations}
+            for row in best_sellers
+        ],
+    }
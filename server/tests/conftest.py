@@ -0,0 +1,83 @@
+import os
+import pytest
+from flask import request_finished
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app
+from auth import user_claims
+from models import db, User
+
+# Each test gets a fresh app on a file-backed SQLite database, and again on
+# Postgres when TEST_DATABASE_URL is set (its tables are dropped afterwards,
+# so point it at a scratch database).
+
+TEST_CONFIG = {
+    'SECRET_KEY': 'test-secret-key-with-at-least-32-bytes',
+    'JWT_SECRET_KEY': 'test-secret-key-with-at-least-32-bytes',
+    'HASH_WORKERS': 0,
+    'RATE_LIMITS': '',
+    'MAX_CONCURRENT_REQUESTS': 0,
+    'DATABASE_REPLICA_URLS': '',
+    'LOG_FILE': '',
+}
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def database_url(request, tmp_path):
+    if request.param == 'sqlite':
+        return f"sqlite:///{tmp_path / 'test.db'}"
+    url = os.getenv('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    return url
+
+@pytest.fixture
+def app(database_url):
+    app = create_app({**TEST_CONFIG, 'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+# make_user(username, is_admin) creates a user and returns (id, headers)
+@pytest.fixture
+def make_user(app):
+    def make(username='user', is_admin=False):
+        with app.app_context():
+            user = User(email=f'{username}@example.com', username=username, password_hash='-', is_admin=is_admin)
+            db.session.add(user)
+            db.session.commit()
+            token = create_access_token(identity=str(user.id), additional_claims=user_claims(user))
+            return user.id, {'Authorization': 'Bearer ' + token}
+    return make
+
+# SQL statements sent to the database, in order; clear it before the request
+# being measured
+@pytest.fixture
+def statements(app):
+    recorded = []
+    def record(connection, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(engine, 'before_cursor_execute', record)
+
+# The app's own responses, to tell streamed bodies from buffered ones (the
+# test client's wrapper reports every response as streamed)
+@pytest.fixture
+def app_responses(app):
+    responses = []
+    def record(sender, response, **extra):
+        responses.append(response)
+    request_finished.connect(record, app)
+    yield responses
+    request_finished.disconnect(record, app)
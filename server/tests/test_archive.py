@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from models import db, Event, Order, Ticket, TicketArchive, UserEvent
+
+def test_archiving_keeps_orders(app, client, make_user):
+    user_id, headers = make_user()
+    with app.app_context():
+        event = Event(image='-', name='Past', location='Nairobi', capacity=10, number_of_tickets=9,
+                      datetime=datetime.utcnow() - timedelta(days=30))
+        db.session.add(event)
+        db.session.flush()
+        ticket = Ticket(event_id=event.id, user_id=user_id, price=10.0)
+        db.session.add(ticket)
+        db.session.flush()
+        completed = Order(idempotency_key='done', user_id=user_id, event_id=event.id, phone_number='1',
+                          status='completed', ticket_id=ticket.id)
+        db.session.add(completed)
+        db.session.commit()
+        event_id, completed_id, ticket_id = event.id, completed.id, ticket.id
+
+    queued = {**headers, 'Prefer': 'respond-async', 'Idempotency-Key': 'queued'}
+    response = client.post('/tickets', json={'event_id': event_id, 'phone_number': '1'}, headers=queued)
+    assert response.status_code == 202
+    pending_id = response.json['id']
+
+    result = app.test_cli_runner().invoke(args=['archive-events'])
+    assert result.exit_code == 0, result.output
+
+    response = client.get(f'/orders/{pending_id}', headers=headers)
+    assert response.status_code == 200
+    assert (response.json['status'], response.json['error']) == ('failed', 'Event has ended')
+
+    response = client.get(f'/orders/{completed_id}', headers=headers)
+    assert response.status_code == 200
+    assert (response.json['status'], response.json['ticket_id']) == ('completed', ticket_id)
+
+    # A retry with the same key still finds the order
+    response = client.post('/tickets', json={'event_id': event_id, 'phone_number': '1'}, headers=queued)
+    assert (response.status_code, response.json['id']) == (200, pending_id)
+
+    with app.app_context():
+        assert db.session.get(Ticket, ticket_id) is None
+        assert db.session.query(TicketArchive).filter_by(id=ticket_id).count() == 1
+
+def test_registrations_include_archived(app, client, make_user):
+    user_id, _ = make_user()
+    with app.app_context():
+        past = Event(image='-', name='Past', location='Nairobi', capacity=10, number_of_tickets=10,
+                     datetime=datetime.utcnow() - timedelta(days=30))
+        upcoming = Event(image='-', name='Upcoming', location='Nairobi', capacity=10, number_of_tickets=10,
+                         datetime=datetime.utcnow() + timedelta(days=30))
+        db.session.add_all([past, upcoming])
+        db.session.flush()
+        db.session.add_all([UserEvent(user_id=user_id, event_id=past.id), UserEvent(user_id=user_id, event_id=upcoming.id)])
+        db.session.commit()
+        past_id, upcoming_id = past.id, upcoming.id
+
+    result = app.test_cli_runner().invoke(args=['archive-events'])
+    assert result.exit_code == 0, result.output
+
+    response = client.get(f'/users/{user_id}/events')
+    assert [event['id'] for event in response.json] == [upcoming_id]
+    response = client.get(f'/users/{user_id}/events?include_archived=true')
+    assert [event['id'] for event in response.json] == [past_id, upcoming_id]
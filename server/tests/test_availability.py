@@ -0,0 +1,38 @@
+import threading
+import availability
+from models import db, Event
+
+STREAMS = 2
+CLIENTS = 8
+
+def test_stream_limit_holds_under_concurrency(app, client):
+    availability._settings['max_streams'] = STREAMS
+    with app.app_context():
+        event = Event(image='-', name='Live', location='Nairobi', capacity=5, number_of_tickets=5)
+        db.session.add(event)
+        db.session.commit()
+        event_id = event.id
+
+    opened, done = threading.Barrier(CLIENTS), threading.Barrier(CLIENTS)
+    statuses = []
+
+    # Each stream stays open until every client has asked for one, and is
+    # closed by the thread that opened it (its request context lives there)
+    def watch():
+        opened.wait()
+        response = app.test_client().get(f'/events/{event_id}/availability/stream', buffered=False)
+        statuses.append(response.status_code)
+        done.wait()
+        response.close()
+
+    threads = [threading.Thread(target=watch) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(statuses) == [200] * STREAMS + [503] * (CLIENTS - STREAMS)
+    assert availability.broker.streams == 0
+    response = client.get(f'/events/{event_id}/availability/stream', buffered=False)
+    assert response.status_code == 200
+    response.close()
+    assert availability.broker.streams == 0
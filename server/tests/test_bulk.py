@@ -0,0 +1,34 @@
+from models import db, Event, Ticket
+
+def _event(app, name):
+    with app.app_context():
+        event = Event(image='-', name=name, location='Nairobi', capacity=10, number_of_tickets=10)
+        db.session.add(event)
+        db.session.commit()
+        return event.id
+
+def test_bulk_delete_events_with_dependents(app, client, make_user):
+    _, headers = make_user()
+    _, admin = make_user('admin', is_admin=True)
+    sold, queued, empty = _event(app, 'Sold'), _event(app, 'Queued'), _event(app, 'Empty')
+    response = client.post('/tickets', json={'event_id': sold, 'phone_number': '1'}, headers=headers)
+    assert response.status_code == 200
+    with app.app_context():
+        ticket_id = db.session.query(Ticket.id).filter_by(event_id=sold).scalar()
+    response = client.post('/tickets', json={'event_id': queued, 'phone_number': '1'},
+                           headers={**headers, 'Prefer': 'respond-async', 'Idempotency-Key': 'k'})
+    assert response.status_code == 202
+
+    body = '\n'.join([str(sold), '{not json', str(queued), str(empty)])
+    response = client.delete('/events/bulk', data=body, headers={**admin, 'Content-Type': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.json['results'] == [
+        {'index': 0, 'id': sold, 'status': 'deleted'},
+        {'index': 1, 'error': 'Invalid JSON'},
+        {'index': 2, 'error': 'Event has orders'},
+        {'index': 3, 'id': empty, 'status': 'deleted'},
+    ]
+    with app.app_context():
+        assert db.session.get(Event, sold) is None
+        assert db.session.get(Event, queued) is not None
+        assert db.session.get(Ticket, ticket_id).event_id is None
@@ -0,0 +1,25 @@
+import hashlib
+import cache
+from models import db, Event
+
+def test_list_etag_follows_the_generation(app, client, make_user):
+    _, admin = make_user('admin', is_admin=True)
+    with app.app_context():
+        db.session.add(Event(image='-', name='Show', location='Nairobi', capacity=5, number_of_tickets=5))
+        db.session.commit()
+
+    response = client.get('/events?limit=5')
+    etag = response.headers['ETag'].strip('"')
+    with app.test_request_context('/events?limit=5'):
+        key = cache.event_list_key()
+    assert etag == hashlib.blake2b(f'{cache.cache.etag_scope}:{key}'.encode(), digest_size=16).hexdigest()
+    assert client.get('/events?limit=5', headers={'If-None-Match': f'"{etag}"'}).status_code == 304
+
+    response = client.post('/events', headers=admin, json={
+        'name': 'Another', 'image': '-', 'location': 'Mombasa', 'description': '-',
+        'capacity': 5, 'number_of_tickets': 5,
+    })
+    assert response.status_code == 201
+    response = client.get('/events?limit=5', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.headers['ETag'].strip('"') != etag
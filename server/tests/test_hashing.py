@@ -0,0 +1,22 @@
+import time
+import pytest
+from flask import Flask
+import hashing
+
+@pytest.fixture
+def pool():
+    app = Flask(__name__)
+    app.config.update(HASH_WORKERS=1, HASH_QUEUE_SIZE=1, HASH_TIMEOUT=0.2, PASSWORD_HASH_METHOD='pbkdf2:sha256:1000')
+    hashing.init_hashing(app)
+    yield
+    hashing._get_executor().shutdown(wait=True)
+    hashing._executor = None
+
+def test_timeout_is_busy_and_keeps_slot_until_done(pool):
+    with pytest.raises(hashing.HashingBusy):
+        hashing._run(time.sleep, 1)
+    # The abandoned job still holds the only slot
+    with pytest.raises(hashing.HashingBusy):
+        hashing.hash_password('secret')
+    time.sleep(1.2)
+    assert hashing.verify_password(hashing.hash_password('secret'), 'secret')
@@ -0,0 +1,55 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import func, select, text, tuple_
+from models import db, Event, Ticket, User, UserEvent
+
+# Each hot lookup must be answered through an index. Queries are compiled with
+# literal values and run under EXPLAIN QUERY PLAN on SQLite, or EXPLAIN on
+# Postgres with sequential scans disabled (the tables are empty, so the
+# planner would otherwise pick them). The lookups are (name, query, table,
+# acceptable index names or None for any index).
+HOT_QUERIES = [
+    ('login by email', lambda: select(User).where(func.lower(User.email) == 'fan@example.com'),
+     'users', ('ix_users_email_lower',)),
+    ('tickets by event', lambda: select(Ticket).where(Ticket.event_id == 1),
+     'tickets', ('ix_tickets_event_id',)),
+    ('tickets by user', lambda: select(Ticket).where(Ticket.user_id == 1),
+     'tickets', ('ix_tickets_user_id',)),
+    ('registrations by user', lambda: select(UserEvent).where(UserEvent.user_id == 1),
+     'user_events', None),
+    ('registrations by event', lambda: select(UserEvent).where(UserEvent.event_id == 1),
+     'user_events', ('ix_user_events_event_id',)),
+    ('registration lookup', lambda: select(UserEvent).where(UserEvent.user_id == 1, UserEvent.event_id == 1),
+     'user_events', None),
+    ('event listing page', lambda: (
+        select(Event)
+        .where(Event.archived_at.is_(None), tuple_(Event.datetime, Event.id) > (datetime(2026, 1, 1), 5))
+        .order_by(Event.datetime, Event.id).limit(50)
+     ), 'events', ('ix_events_active_datetime_id', 'ix_events_datetime_id')),
+]
+
+def explain(query):
+    sql = str(query.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'sqlite':
+        return [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+    db.session.execute(text('SET LOCAL enable_seqscan = off'))
+    return [row[0] for row in db.session.execute(text('EXPLAIN ' + sql))]
+
+def uses_index(plan, table, dialect):
+    if dialect == 'sqlite':
+        lines = [line for line in plan if line.split()[1:2] == [table]]
+        if not lines or any(line.startswith('SCAN') for line in lines):
+            return False
+        return all(' INDEX' in line for line in lines)
+    plan_text = '\n'.join(plan)
+    return 'Seq Scan' not in plan_text and f' on {table}' in plan_text and 'Index' in plan_text
+
+@pytest.mark.parametrize('name, query, table, indexes', HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_index(app, name, query, table, indexes):
+    with app.app_context():
+        plan = explain(query())
+        dialect = db.engine.dialect.name
+        db.session.rollback()
+    assert uses_index(plan, table, dialect), plan
+    if indexes is not None:
+        assert any(index in line for line in plan for index in indexes), plan
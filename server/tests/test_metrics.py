@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import text
+from metrics import registry
+from models import db, Event, Ticket
+
+def sql_statements(endpoint, method='GET'):
+    return registry.sql_statements.get((endpoint, method), 0)
+
+def test_auth_queries_are_counted(client, make_user):
+    _, headers = make_user()
+    before = sql_statements('home')
+    response = client.get('/', headers=headers)
+    assert response.status_code == 200
+    # Home runs no SQL itself; loading the revocation list does
+    assert sql_statements('home') > before
+
+def test_streamed_response_recorded_on_close(app, client, make_user, app_responses):
+    user_id, _ = make_user()
+    with app.app_context():
+        db.session.add_all([Ticket(user_id=user_id, price=1.0) for _ in range(3)])
+        db.session.commit()
+    before_sql = sql_statements('tickets')
+    before_count = registry.latency[('tickets', 'GET')].count
+
+    response = client.get('/tickets', headers={'Accept': 'application/x-ndjson'})
+    assert response.get_data().count(b'\n') == 3
+    response.close()
+    assert app_responses[-1].is_streamed
+    assert registry.latency[('tickets', 'GET')].count == before_count + 1
+    assert sql_statements('tickets') > before_sql
+
+def test_event_streams_are_kept_out_of_latency(app, client, make_user, app_responses):
+    with app.app_context():
+        event = Event(image='-', name='Live', location='Nairobi', capacity=5, number_of_tickets=5)
+        db.session.add(event)
+        db.session.commit()
+        event_id = event.id
+    key = ('eventavailability', 'GET')
+    before_requests = registry.requests.get(key + (200,), 0)
+    before_count = registry.latency[key].count
+
+    response = client.get(f'/events/{event_id}/availability/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    response.close()
+    assert registry.requests[key + (200,)] == before_requests + 1
+    assert registry.latency[key].count == before_count
+
+def test_failed_statement_does_not_skew_timing(app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            with pytest.raises(Exception):
+                connection.execute(text('SELECT * FROM no_such_table'))
+            connection.rollback()
+            assert 'query_start' not in connection.info
+            connection.execute(text('SELECT 1'))
+            assert 'query_start' not in connection.info
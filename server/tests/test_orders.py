@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from models import db, Event
+from orders import enqueue_order
+
+def test_queued_order_for_missing_event(client, make_user):
+    _, headers = make_user()
+    queued = {**headers, 'Prefer': 'respond-async', 'Idempotency-Key': 'missing'}
+    response = client.post('/tickets', json={'event_id': 999, 'phone_number': '1'}, headers=queued)
+    assert response.status_code == 404
+
+def test_queued_order_retry_with_string_event_id(app, client, make_user):
+    _, headers = make_user()
+    with app.app_context():
+        event = Event(image='-', name='Show', location='Nairobi', capacity=5, number_of_tickets=5)
+        db.session.add(event)
+        db.session.commit()
+        event_id = event.id
+    queued = {**headers, 'Prefer': 'respond-async', 'Idempotency-Key': 'retry'}
+
+    response = client.post('/tickets', json={'event_id': event_id, 'phone_number': '1'}, headers=queued)
+    assert response.status_code == 202
+    order_id = response.json['id']
+    response = client.post('/tickets', json={'event_id': str(event_id), 'phone_number': '1'}, headers=queued)
+    assert (response.status_code, response.json['id']) == (200, order_id)
+    response = client.post('/tickets', json={'event_id': 'x', 'phone_number': '1'}, headers=queued)
+    assert response.status_code == 400
+
+def test_foreign_key_violation_is_not_a_duplicate(app, make_user, database_url):
+    if database_url.startswith('sqlite'):
+        pytest.skip('SQLite does not enforce foreign keys here')
+    user_id, _ = make_user()
+    with app.app_context():
+        with pytest.raises(IntegrityError):
+            enqueue_order(user_id, 'key', 999, '1')
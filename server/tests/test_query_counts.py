@@ -0,0 +1,60 @@
+import pytest
+from models import db, Event, Ticket, User, UserEvent
+
+# Statement budgets for the collection endpoints. A page costs one query no
+# matter how many rows or relations it holds, so an N+1 regression shows up
+# as soon as there is more than one row.
+QUERY_LIMITS = {
+    '/events': 1,
+    '/events?stream=true': 1,
+    '/events/search?q=concert': 2,
+    '/tickets': 1,
+    '/tickets?stream=true': 1,
+    '/user_events': 1,
+    '/user_events?stream=true': 1,
+    '/users/{user_id}/events': 1,
+    '/users/{user_id}/events?limit=5': 1,
+}
+
+@pytest.fixture
+def seeded(app):
+    with app.app_context():
+        users = [User(email=f'fan{i}@example.com', username=f'fan{i}', password_hash='-') for i in range(3)]
+        events = [
+            Event(image='-', name=f'Concert {i}', location='Nairobi', description='Live music', capacity=10, number_of_tickets=10)
+            for i in range(20)
+        ]
+        db.session.add_all(users + events)
+        db.session.flush()
+        for user in users:
+            for event in events:
+                db.session.add(UserEvent(user_id=user.id, event_id=event.id))
+                db.session.add(Ticket(user_id=user.id, event_id=event.id, price=10.0))
+        db.session.commit()
+        return users[0].id
+
+@pytest.mark.parametrize('url, limit', QUERY_LIMITS.items())
+def test_collection_query_count(client, seeded, statements, app_responses, url, limit):
+    statements.clear()
+    response = client.get(url.format(user_id=seeded))
+    body = response.get_data()
+    response.close()
+    assert app_responses[-1].is_streamed == ('stream=' in url)
+    assert response.status_code == 200
+    assert body.strip() not in (b'', b'[]')
+    assert 1 <= len(statements) <= limit, statements
+
+@pytest.mark.parametrize('url', ['/events', '/tickets', '/user_events'])
+def test_ndjson_stream_query_count(client, seeded, statements, app_responses, url):
+    statements.clear()
+    response = client.get(url, headers={'Accept': 'application/x-ndjson'})
+    assert response.get_data().count(b'\n') > 1
+    response.close()
+    assert app_responses[-1].is_streamed
+    assert len(statements) == 1, statements
+
+def test_registered_events_unknown_user_query_count(client, seeded, statements):
+    statements.clear()
+    response = client.get('/users/9999/events')
+    assert response.status_code == 404
+    assert len(statements) <= 2, statements
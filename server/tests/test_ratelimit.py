@@ -0,0 +1,29 @@
+import pytest
+from app import create_app
+from models import db
+from conftest import TEST_CONFIG
+
+@pytest.fixture
+def limited_app(tmp_path):
+    app = create_app({
+        **TEST_CONFIG,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'RATE_LIMITS': 'login:post=1/60',
+        'PROXY_HOPS': 1,
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def login(client, address):
+    return client.post('/login', json={'email': 'nobody@example.com', 'password': 'x'},
+                       headers={'X-Forwarded-For': address}).status_code
+
+def test_anonymous_clients_behind_a_proxy_get_their_own_bucket(limited_app):
+    client = limited_app.test_client()
+    assert login(client, '203.0.113.1') != 429
+    assert login(client, '203.0.113.2') != 429
+    assert login(client, '203.0.113.1') == 429
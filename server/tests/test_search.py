@@ -0,0 +1,62 @@
+import pytest
+from datetime import datetime, timedelta
+import search
+from models import db, Event
+
+@pytest.fixture
+def events(app):
+    search._index = None
+    with app.app_context():
+        event = Event(image='-', name='Jazz Night', location='Nairobi', capacity=100, number_of_tickets=100)
+        db.session.add(event)
+        db.session.commit()
+        return event.id
+
+# Full reads of the events table, i.e. index rebuilds
+def scans(statements):
+    return [statement for statement in statements if 'FROM events' in statement and 'WHERE' not in statement]
+
+def test_ticket_sales_do_not_rebuild_index(app, client, events, make_user, statements):
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        pytest.skip('Postgres searches the tsvector column, not the in-process index')
+    _, headers = make_user()
+    assert [hit['id'] for hit in client.get('/events/search?q=jazz').json] == [events]
+    for _ in range(3):
+        response = client.post('/tickets', json={'event_id': events, 'phone_number': '254700000000'}, headers=headers)
+        assert response.status_code == 200
+    statements.clear()
+    client.get('/events/search?q=jazz')
+    assert not scans(statements)
+
+def test_new_events_are_searchable(app, client, events, make_user):
+    _, headers = make_user('admin', is_admin=True)
+    client.get('/events/search?q=jazz')
+    response = client.post('/events', headers=headers, json={
+        'name': 'Jazz Brunch', 'image': '-', 'location': 'Mombasa', 'description': 'Live jazz',
+        'capacity': 50, 'number_of_tickets': 50,
+    })
+    assert response.status_code == 201
+    assert len(client.get('/events/search?q=jazz').json) == 2
+
+def test_index_expires_for_writes_from_other_workers(app, client, events):
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        pytest.skip('Postgres searches the tsvector column, not the in-process index')
+    client.get('/events/search?q=jazz')
+    # Written without bumping this process's generation, as another worker would
+    with app.app_context():
+        db.session.add(Event(image='-', name='Jazz Picnic', location='Kisumu', capacity=10, number_of_tickets=10))
+        db.session.commit()
+    assert len(client.get('/events/search?q=jazz').json) == 1
+    app.config['SEARCH_INDEX_MAX_AGE'] = 0
+    assert len(client.get('/events/search?q=jazz').json) == 2
+
+def test_archived_events_are_hidden(app, client, events):
+    with app.app_context():
+        db.session.add(Event(image='-', name='Jazz Reunion', location='Nairobi', capacity=10, number_of_tickets=10,
+                             datetime=datetime.utcnow() - timedelta(days=30)))
+        db.session.commit()
+    assert len(client.get('/events/search?q=jazz').json) == 2
+    result = app.test_cli_runner().invoke(args=['archive-events'])
+    assert result.exit_code == 0, result.output
+    assert [hit['id'] for hit in client.get('/events/search?q=jazz').json] == [events]
+    assert len(client.get('/events/search?q=jazz&include_archived=true').json) == 2
@@ -0,0 +1,49 @@
+from models import db, Event
+
+def _event(app, tickets=10):
+    with app.app_context():
+        event = Event(image='-', name='Show', location='Nairobi', capacity=tickets, number_of_tickets=tickets)
+        db.session.add(event)
+        db.session.commit()
+        return event.id
+
+def test_seat_map_refused_after_general_admission_sales(app, client, make_user):
+    _, headers = make_user()
+    _, admin = make_user('admin', is_admin=True)
+    event_id = _event(app)
+    for _ in range(3):
+        response = client.post('/tickets', json={'event_id': event_id, 'phone_number': '1'}, headers=headers)
+        assert response.status_code == 200
+
+    response = client.post(f'/events/{event_id}/seats', json={'rows': 2, 'seats_per_row': 5}, headers=admin)
+    assert response.status_code == 409
+    with app.app_context():
+        assert db.session.get(Event, event_id).number_of_tickets == 7
+
+def test_seat_map_refused_with_queued_orders(app, client, make_user):
+    _, headers = make_user()
+    _, admin = make_user('admin', is_admin=True)
+    event_id = _event(app)
+    queued = {**headers, 'Prefer': 'respond-async', 'Idempotency-Key': 'queued'}
+    response = client.post('/tickets', json={'event_id': event_id, 'phone_number': '1'}, headers=queued)
+    assert response.status_code == 202
+
+    response = client.post(f'/events/{event_id}/seats', json={'rows': 2, 'seats_per_row': 5}, headers=admin)
+    assert response.status_code == 409
+
+def test_seat_map_replaces_unsold_inventory(app, client, make_user):
+    _, headers = make_user()
+    _, admin = make_user('admin', is_admin=True)
+    event_id = _event(app)
+
+    response = client.post(f'/events/{event_id}/seats', json={'rows': 2, 'seats_per_row': 3}, headers=admin)
+    assert response.status_code == 201
+    response = client.post('/tickets', json={'event_id': event_id, 'phone_number': '1'}, headers=headers)
+    assert response.status_code == 409
+
+    response = client.post(f'/events/{event_id}/holds', json={'seats': [0, 1]}, headers=headers)
+    assert response.status_code == 201
+    response = client.post(f"/holds/{response.json['id']}/purchase", json={'phone_number': '1'}, headers=headers)
+    assert response.status_code == 201
+    with app.app_context():
+        assert db.session.get(Event, event_id).number_of_tickets == 4
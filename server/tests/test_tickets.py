@@ -0,0 +1,35 @@
+import threading
+from sqlalchemy import func, select
+from models import db, Event, Ticket
+
+TICKETS = 10
+BUYERS = 40
+
+def test_concurrent_purchases_never_oversell(app, make_user):
+    _, headers = make_user()
+    with app.app_context():
+        event = Event(image='-', name='Sale', location='Nairobi', capacity=TICKETS, number_of_tickets=TICKETS)
+        db.session.add(event)
+        db.session.commit()
+        event_id = event.id
+
+    barrier = threading.Barrier(BUYERS)
+    statuses = []
+
+    def buy():
+        client = app.test_client()
+        barrier.wait()
+        response = client.post('/tickets', json={'event_id': event_id, 'phone_number': '254700000000'}, headers=headers)
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=buy) for _ in range(BUYERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses.count(200) == TICKETS
+    assert statuses.count(400) == BUYERS - TICKETS
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).select_from(Ticket)) == TICKETS
+        assert db.session.get(Event, event_id).number_of_tickets == 0
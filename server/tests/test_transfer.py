@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import delete, select
+from models import db, Event, Ticket, UserEvent
+
+@pytest.fixture
+def seeded(app, make_user):
+    user_id, _ = make_user('fan')
+    _, headers = make_user('admin', is_admin=True)
+    with app.app_context():
+        event = Event(image='-', name='Gala', location='Nairobi', capacity=10, number_of_tickets=10)
+        db.session.add(event)
+        db.session.flush()
+        db.session.add_all([
+            Ticket(event_id=event.id, user_id=user_id, price=25.0, seat=1, phone_number='254700000001'),
+            Ticket(event_id=event.id, user_id=user_id, price=25.0),
+            UserEvent(event_id=event.id, user_id=user_id),
+        ])
+        db.session.commit()
+    return headers
+
+def snapshot(model):
+    columns = model.__table__.columns
+    return sorted(tuple(row) for row in db.session.execute(select(*columns)))
+
+@pytest.mark.parametrize('table, model', [('tickets', Ticket), ('user_events', UserEvent)])
+@pytest.mark.parametrize('format, mimetype', [('csv', 'text/csv'), ('ndjson', 'application/x-ndjson')])
+def test_export_then_import_round_trips(app, client, seeded, table, model, format, mimetype):
+    response = client.get(f'/admin/export/{table}?format={format}', headers=seeded)
+    assert response.status_code == 200
+    body = response.get_data()
+    response.close()
+    with app.app_context():
+        before = snapshot(model)
+        db.session.execute(delete(model))
+        db.session.commit()
+
+    response = client.post(f'/admin/import/{table}', data=body, content_type=mimetype, headers=seeded)
+    assert response.status_code == 200, response.json
+    assert response.json['imported'] == len(before)
+    with app.app_context():
+        assert snapshot(model) == before
+
+def test_export_header_matches_import_columns(client, seeded):
+    response = client.get('/admin/export/tickets?format=csv', headers=seeded)
+    header = response.get_data().split(b'\n', 1)[0]
+    response.close()
+    assert header == b'id,ticket_number,price,event_id,user_id,seat,phone_number'
+
+def test_ndjson_import_rejects_mixed_ids(client, seeded):
+    body = b'{"id": 50, "user_id": 1, "event_id": 1}\n{"user_id": 2, "event_id": 1}\n'
+    response = client.post('/admin/import/user_events', data=body, content_type='application/x-ndjson', headers=seeded)
+    assert response.status_code == 400
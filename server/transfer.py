@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from flask import Response, stream_with_context
+from sqlalchemy import insert, text
+from models import db, Ticket, UserEvent
+from serializers import STREAM_CHUNK_ROWS, ModelSerializer, stream_rows
+
+# Bulk CSV/NDJSON export and import of tickets and registrations for admins.
+#
+# Exports stream straight from the database: on Postgres CSV comes from
+# COPY ... TO STDOUT in keyset-paginated chunks, so the server only relays
+# bytes; elsewhere (and for NDJSON) rows are fetched with yield_per and encoded
+# a chunk at a time. Either way memory is bounded by one chunk.
+#
+# Imports read the request body as a stream. CSV on Postgres is piped into
+# COPY ... FROM STDIN; otherwise rows are parsed and inserted with executemany
+# in chunks. An import is one transaction: any bad row rejects the whole file.
+# Imported rows don't touch ticket inventory; event_stats is rebuilt after.
+#
+# Both directions use the same columns: id followed by the table's columns, so
+# an export can be imported as is. id is optional on import (given on every
+# row or none); on Postgres the id sequence is moved past imported ids.
+
+COPY_CHUNK_ROWS = 100000
+
+TABLES = {
+    'tickets': {
+        'model': Ticket,
+        'columns': ('ticket_number', 'price', 'event_id', 'user_id', 'seat', 'phone_number'),
+        'required': ('ticket_number', 'price', 'event_id'),
+    },
+    'user_events': {
+        'model': UserEvent,
+        'columns': ('user_id', 'event_id'),
+        'required': ('user_id', 'event_id'),
+    },
+}
+
+class TransferError(Exception):
+    pass
+
+_serializers = {}
+
+def _serializer(table):
+    serializer = _serializers.get(table)
+    if serializer is None:
+        spec = TABLES[table]
+        serializer = _serializers[table] = ModelSerializer(spec['model'], ('id',) + spec['columns'])
+    return serializer
+
+def _use_copy():
+    return db.engine.dialect.name == 'postgresql' and db.engine.dialect.driver == 'psycopg2'
+
+def _copy_export(table, fields):
+    cursor = db.session.connection().connection.cursor()
+    columns = ', '.join(fields)
+    last_id = 0
+    header = ', HEADER'
+    while True:
+        buffer = io.BytesIO()
+        cursor.copy_expert(
+            f'COPY (SELECT {columns} FROM {table} WHERE id > {last_id} ORDER BY id LIMIT {COPY_CHUNK_ROWS}) '
+            f'TO STDOUT WITH (FORMAT csv{header})',
+            buffer
+        )
+        data = buffer.getvalue()
+        rows = data.count(b'\n') - (1 if header else 0)
+        if rows > 0 or header:
+            yield data
+        if rows < COPY_CHUNK_ROWS:
+            return
+        # id is the first column and exported fields never contain newlines
+        last_id = int(data.rstrip(b'\n').rsplit(b'\n', 1)[-1].split(b',', 1)[0])
+        header = ''
+
+def _csv_export(serializer, statement):
+    result = db.session.execute(statement.execution_options(yield_per=STREAM_CHUNK_ROWS))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(serializer.fields)
+    for rows in result.partitions():
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def export_table(table, format):
+    model = TABLES[table]['model']
+    serializer = _serializer(table)
+    if format == 'ndjson':
+        return stream_rows(serializer, serializer.select().order_by(model.id), 'ndjson')
+    if _use_copy():
+        body = _copy_export(table, serializer.fields)
+    else:
+        body = _csv_export(serializer, serializer.select().order_by(model.id))
+    headers = {'Content-Disposition': f'attachment; filename={table}.csv'}
+    return Response(stream_with_context(body), mimetype='text/csv', headers=headers)
+
+def _check_columns(table, columns):
+    spec = TABLES[table]
+    unknown = [column for column in columns if column != 'id' and column not in spec['columns']]
+    if unknown:
+        raise TransferError('Unknown columns: ' + ', '.join(unknown))
+    missing = [column for column in spec['required'] if column not in columns]
+    if missing:
+        raise TransferError('Missing columns: ' + ', '.join(missing))
+
+def _converters(model, columns):
+    converters = []
+    for column in columns:
+        python_type = getattr(model, column).type.python_type
+        converters.append(python_type if python_type in (int, float) else str)
+    return converters
+
+def _csv_rows(table, stream):
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    columns = next(reader, None)
+    if columns is None:
+        raise TransferError('Empty file')
+    _check_columns(table, columns)
+    converters = _converters(TABLES[table]['model'], columns)
+    for line, values in enumerate(reader, start=2):
+        if len(values) != len(columns):
+            raise TransferError(f'Line {line}: expected {len(columns)} fields')
+        try:
+            yield {
+                column: None if value == '' else convert(value)
+                for column, convert, value in zip(columns, converters, values)
+            }
+        except ValueError as e:
+            raise TransferError(f'Line {line}: {e}')
+
+def _ndjson_rows(table, stream):
+    columns = None
+    for line, value in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        if not value.strip():
+            continue
+        try:
+            item = json.loads(value)
+        except ValueError:
+            raise TransferError(f'Line {line}: invalid JSON')
+        if not isinstance(item, dict):
+            raise TransferError(f'Line {line}: expected an object')
+        _check_columns(table, list(item))
+        # executemany needs the same keys on every row
+        if columns is None:
+            columns = (('id',) if 'id' in item else ()) + TABLES[table]['columns']
+        elif ('id' in item) != (columns[0] == 'id'):
+            raise TransferError(f'Line {line}: id must be given on every line or none')
+        yield {column: item.get(column) for column in columns}
+
+# After inserting explicit ids, make the next generated id follow them
+def _sync_id_sequence(table):
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(
+            text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}")
+        )
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Import a CSV or NDJSON body into table; returns the number of rows written
+def import_table(table, stream, mimetype, chunk_size):
+    model = TABLES[table]['model']
+    try:
+        if mimetype == 'text/csv' and _use_copy():
+            # Only the header is read here; COPY checks the rest
+            header = stream.readline()
+            columns = next(csv.reader([header.decode('utf-8')]), [])
+            _check_columns(table, columns)
+            cursor = db.session.connection().connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                stream
+            )
+            count = cursor.rowcount
+        else:
+            rows = _csv_rows(table, stream) if mimetype == 'text/csv' else _ndjson_rows(table, stream)
+            count = 0
+            for chunk in _chunks(rows, chunk_size):
+                db.session.execute(insert(model.__table__), chunk)
+                count += len(chunk)
+        _sync_id_sequence(table)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return count